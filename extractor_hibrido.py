@@ -17,8 +17,10 @@
 ║  Uso:                                                                    ║
 ║    python extractor_hibrido.py                                          ║
 ║    python extractor_hibrido.py --max 300                                ║
+║    python extractor_hibrido.py --concurrencia 4                         ║
 ║    python extractor_hibrido.py --solo-doctoralia                        ║
 ║    python extractor_hibrido.py --mock                                   ║
+║    python extractor_hibrido.py --reanudar                               ║
 ╠══════════════════════════════════════════════════════════════════════════╣
 ║  Variables de entorno (.env):                                           ║
 ║    PHANTOMBUSTER_API_KEY  → Settings → API en app.phantombuster.com     ║
@@ -28,17 +30,29 @@
 Dependencias:
     pip install playwright requests python-dotenv
     playwright install chromium
+
+Opcional (perfiles vía HTTP sin navegador, mucho más rápido):
+    pip install "httpx[http2]" selectolax pyahocorasick rapidfuzz orjson
+
+Caché: los datos de cada perfil se guardan en .doctoralia_cache (shelve) durante
+30 días; las URLs en caché no se vuelven a visitar. Usa --sin-cache para ignorarla.
 """
 
 import argparse
+import asyncio
+import importlib.util
 import json
 import logging
 import os
 import random
 import re
+import shelve
 import sys
 import time
+import unicodedata
+from collections import Counter, defaultdict
 from datetime import datetime
+from functools import lru_cache
 from pathlib import Path
 from typing import Optional
 
@@ -48,6 +62,33 @@ try:
 except ImportError:
     pass
 
+# Descarga HTTP + parser HTML en C para perfiles (opcional; sin ellos se usa Playwright)
+try:
+    import httpx
+    from selectolax.parser import HTMLParser
+except ImportError:
+    httpx      = None
+    HTMLParser = None
+
+# Serialización JSON en C para guardar resultados (opcional; sin él se usa json)
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+# Matching difuso de nombres en C para Phantombuster (opcional; sin él se usa substring)
+try:
+    from rapidfuzz import fuzz, process
+except ImportError:
+    fuzz    = None
+    process = None
+
+# Búsqueda multipatrón Aho-Corasick para alcaldías (opcional; sin él se usa regex)
+try:
+    import ahocorasick
+except ImportError:
+    ahocorasick = None
+
 logging.basicConfig(
     level=logging.INFO,
     format="%(asctime)s  %(levelname)-8s  %(message)s",
@@ -63,6 +104,19 @@ log = logging.getLogger("extractor_hibrido")
 DEFAULT_OUTPUT = "leads_raw.json"
 DEFAULT_MAX    = 200
 
+USER_AGENT = (
+    "Mozilla/5.0 (Windows NT 10.0; Win64; x64) "
+    "AppleWebKit/537.36 (KHTML, like Gecko) "
+    "Chrome/120.0.0.0 Safari/537.36"
+)
+
+# Recursos que Playwright no descarga: no aportan datos al scraping
+RECURSOS_BLOQUEADOS = frozenset({"image", "media", "font", "stylesheet", "other"})
+DOMINIOS_RASTREO = (
+    "google-analytics", "googletagmanager", "doubleclick",
+    "hotjar", "facebook.net", "connect.facebook",
+)
+
 # ── Nichos y sus URLs en Doctoralia CDMX ─────────────────────────────────────
 NICHOS_DOCTORALIA = [
     {
@@ -114,51 +168,244 @@ SEL = {
     "next_page":        "a[rel='next'], a.next, li.next a",
 }
 
+# Patrones de teléfonos mexicanos (compilados una sola vez)
+_TEL_PATTERNS = tuple(re.compile(p) for p in (
+    r"\+52\s?[\d\s\-]{10,14}",
+    r"55\s?\d{4}\s?\d{4}",     # CDMX con lada 55
+    r"\(\s?55\s?\)\s?\d{4}[\s\-]\d{4}",
+    r"\d{2,3}[\s\-]\d{4}[\s\-]\d{4}",
+))
+
+# Campos que cuentan para elegir el lead más completo al deduplicar
+_CAMPOS_COMPLETITUD = (
+    "empresa", "telefono", "email", "nombre_contacto", "cargo",
+    "sitio_web", "colonia", "linkedin",
+)
+
+# Limpieza de teléfonos: tabla de str.translate que borra todo lo que no sea
+# dígito o "+" en Latin-1; lo que quede fuera (guiones Unicode, etc.) va por regex
+_TEL_TABLA   = str.maketrans("", "", "".join(
+    chr(c) for c in range(256) if chr(c) not in "0123456789+"
+))
+_TEL_NO_DIGITO = re.compile(r"[^\d+]")
+
+# Código postal CDMX: 01000–16999
+_CP_CDMX = re.compile(r"\b(0[1-9]\d{3}|1[0-6]\d{3})\b")
+
+# Palabras que identifican una dirección de CDMX
+KEYWORDS_CDMX = (
+    "ciudad de méxico", "cdmx", "df", "distrito federal",
+    "iztapalapa", "coyoacán", "benito juárez", "cuauhtémoc",
+    "miguel hidalgo", "tlalpan", "xochimilco", "azcapotzalco",
+    "iztacalco", "gustavo a. madero", "venustiano carranza",
+    "tláhuac", "milpa alta", "álvaro obregón", "cuajimalpa",
+    "magdalena contreras", "narvarte", "condesa", "roma norte",
+    "roma sur", "polanco", "del valle", "pedregal", "coyoacan",
+)
+
+# Alcaldías/delegaciones de CDMX, en orden de prioridad para _inferir_delegacion
+ALCALDIAS = (
+    "Álvaro Obregón", "Azcapotzalco", "Benito Juárez", "Coyoacán",
+    "Cuajimalpa", "Cuauhtémoc", "Gustavo A. Madero", "Iztacalco",
+    "Iztapalapa", "Magdalena Contreras", "Miguel Hidalgo", "Milpa Alta",
+    "Tláhuac", "Tlalpan", "Venustiano Carranza", "Xochimilco",
+    # Nombres cortos/populares
+    "GAM", "Del Valle", "Polanco", "Condesa", "Roma",
+)
+
+
+def _alternancia(palabras: tuple) -> re.Pattern:
+    """Una sola regex con todas las palabras (las más largas primero)."""
+    unicas = sorted(set(palabras), key=len, reverse=True)
+    return re.compile("|".join(re.escape(p) for p in unicas), re.IGNORECASE)
+
+
+_RE_CDMX       = _alternancia(KEYWORDS_CDMX)
+_RE_ALCALDIAS  = _alternancia(ALCALDIAS)
+# texto en minúsculas → (prioridad, nombre canónico)
+_ALCALDIA_POR_TEXTO = {alc.lower(): (i, alc) for i, alc in enumerate(ALCALDIAS)}
+
+# Autómata construido una sola vez: encuentra todas las alcaldías en un solo
+# recorrido del texto, incluidas las que se solapan
+_AUTOMATA_ALCALDIAS = None
+if ahocorasick:
+    _AUTOMATA_ALCALDIAS = ahocorasick.Automaton()
+    for _texto, _valor in _ALCALDIA_POR_TEXTO.items():
+        _AUTOMATA_ALCALDIAS.add_word(_texto, _valor)
+    _AUTOMATA_ALCALDIAS.make_automaton()
+
+# Extracción de un perfil dentro de la página en una sola llamada CDP.
+# Cada campo respeta el orden de prioridad de su lista de selectores (no el
+# orden del documento). El texto completo del body sólo se envía si no hay
+# teléfono estructurado, para la búsqueda por regex en Python.
+_JS_DATOS_PERFIL = """(sel) => {
+    const texto = (sels) => {
+        for (const s of sels) {
+            const el = document.querySelector(s);
+            const t = el && el.innerText.trim();
+            if (t) return t;
+        }
+        return null;
+    };
+    const attr = (sels, a) => {
+        for (const s of sels) {
+            const el = document.querySelector(s);
+            const v = el && el.getAttribute(a);
+            if (v) return v;
+        }
+        return null;
+    };
+    const lista = (sels) => {
+        for (const s of sels) {
+            const els = document.querySelectorAll(s);
+            if (els.length) return [...els].map(e => e.innerText.trim()).filter(t => t);
+        }
+        return [];
+    };
+    const tel     = document.querySelector("a[href^='tel:']");
+    const telProp = document.querySelector("span[itemprop='telephone'], meta[itemprop='telephone']");
+    return {
+        nombre:         texto(sel.nombre),
+        telefono_href:  tel ? tel.getAttribute("href") : null,
+        telefono_prop:  telProp ? (telProp.getAttribute("content") || telProp.innerText) : null,
+        consultorio:    texto(sel.consultorio),
+        direccion:      texto(sel.direccion),
+        colonia:        texto(sel.colonia),
+        especialidades: lista(sel.especialidades),
+        sitio_web:      attr(sel.sitio_web, "href"),
+        texto:          (tel || telProp) ? null : (document.body ? document.body.innerText : ""),
+    };
+}"""
+
 
 # ════════════════════════════════════════════════════════════════════════════
 # 1. FUENTE PRINCIPAL — Doctoralia.com.mx vía Playwright
 # ════════════════════════════════════════════════════════════════════════════
 
+class LimitadorDominio:
+    """
+    Garantiza un intervalo mínimo entre navegaciones al mismo dominio,
+    aunque varias páginas trabajen en paralelo (cortesía con Doctoralia).
+    """
+
+    def __init__(self, intervalo_min: float):
+        self.intervalo_min = intervalo_min
+        self._lock         = asyncio.Lock()
+        self._ultimo       = 0.0
+
+    async def esperar(self):
+        async with self._lock:
+            restante = self._ultimo + self.intervalo_min - time.monotonic()
+            if restante > 0:
+                await asyncio.sleep(restante)
+            self._ultimo = time.monotonic()
+
+
 class ScraperDoctoralia:
     """
     Extrae perfiles de profesionales de salud mental desde Doctoralia.com.mx.
 
     Estrategia:
         1. Recorre las páginas de listado de cada nicho
-        2. Extrae el link al perfil individual de cada profesional
-        3. Visita cada perfil para obtener teléfono, dirección y consultorio
-        4. Respeta delays para no sobrecargar el servidor
+        2. Extrae el link al perfil individual de cada profesional y une los
+           links de todos los nichos (cada perfil se visita una sola vez)
+        3. Descarga los perfiles en paralelo para obtener teléfono, dirección
+           y consultorio: primero vía HTTP (httpx + selectolax, sin navegador) y,
+           si el HTML no trae los datos, con el pool de páginas de Playwright
+        4. Respeta delays por página y un intervalo mínimo por dominio
+           para no sobrecargar el servidor
     """
 
-    BASE_DELAY_MIN = 2.0   # segundos entre requests (cortesía)
+    BASE_DELAY_MIN = 2.0   # segundos entre requests de una misma página (cortesía)
     BASE_DELAY_MAX = 4.5
     MAX_PAGINAS    = 10    # máximo de páginas por nicho (20 resultados/página = 200 max)
+    CONCURRENCIA   = 6     # páginas simultáneas compartiendo el BrowserContext
+    INTERVALO_DOMINIO = 0.5  # segundos mínimos entre navegaciones a doctoralia.com.mx
+    RECICLAR_PAGINA = 50   # navegaciones antes de reemplazar una página (libera heap JS)
+    RUTA_CACHE     = ".doctoralia_cache"
+    CACHE_TTL      = 30 * 86400  # los perfiles de Doctoralia casi no cambian
+
+    # Primer elemento que indica que el listado ya se renderizó
+    SEL_LINK_PERFIL = "a[href*='/medico/'], a[href$='.html']"
+
+    # Selectores de la página de perfil individual
+    SEL_NOMBRE = [
+        "h1[itemprop='name']",
+        "h1.doctor-name",
+        "h1",
+        "span[itemprop='name']",
+    ]
+    SEL_CONSULTORIO = [
+        "span[itemprop='name'][itemtype*='MedicalClinic']",
+        "div.office-name",
+        "h2.office-name",
+        "p.clinic-name",
+        "div[data-testid='office-name']",
+    ]
+    SEL_DIRECCION = [
+        "span[itemprop='streetAddress']",
+        "div.address",
+        "p.address",
+        "address",
+    ]
+    SEL_COLONIA = [
+        "span[itemprop='addressLocality']",
+        "span.locality",
+        "div.neighborhood",
+    ]
+    SEL_ESPECIALIDADES = [
+        "span.specialization",
+        "li.specialization",
+        "div[data-testid='specialization']",
+        "ul.specializations li",
+    ]
+    SEL_SITIO_WEB = [
+        "a[itemprop='url']",
+        "a[data-testid='website-link']",
+        "a.website-link",
+    ]
+    SELECTORES_PERFIL = {
+        "nombre":         SEL_NOMBRE,
+        "consultorio":    SEL_CONSULTORIO,
+        "direccion":      SEL_DIRECCION,
+        "colonia":        SEL_COLONIA,
+        "especialidades": SEL_ESPECIALIDADES,
+        "sitio_web":      SEL_SITIO_WEB,
+    }
 
-    def __init__(self, headless: bool = True):
-        self.headless = headless
-        self._browser = None
-        self._context = None
-        self._page    = None
-
-    def iniciar(self):
+    def __init__(self, headless: bool = True, concurrencia: int = CONCURRENCIA,
+                 ruta_diario: Optional[str] = None, ruta_cache: Optional[str] = RUTA_CACHE):
+        self.headless     = headless
+        self.concurrencia = max(1, concurrencia)
+        self.ruta_diario  = ruta_diario   # .jsonl donde se anexa cada lead al extraerlo
+        self.ruta_cache   = ruta_cache    # shelve url_perfil → datos del perfil (None = sin caché)
+        self._diario      = None
+        self._cache       = None
+        self._pw          = None
+        self._browser     = None
+        self._context     = None
+        self._paginas: Optional[asyncio.Queue] = None
+        self._visitas: dict = {}          # página → navegaciones desde que se creó
+        self._slots       = asyncio.Semaphore(self.concurrencia)
+        self._limitador   = LimitadorDominio(self.INTERVALO_DOMINIO)
+        self._http        = None
+        self._hoy         = datetime.now().strftime("%Y-%m-%d")   # fecha_extraccion de los leads
+
+    async def iniciar(self):
         try:
-            from playwright.sync_api import sync_playwright
+            from playwright.async_api import async_playwright
         except ImportError:
             log.error("❌  playwright no instalado: pip install playwright && playwright install chromium")
             sys.exit(1)
 
-        # ── Fix para Windows (Python 3.11+) ───────────────────────────────────
-        # Playwright necesita ProactorEventLoop en Windows (es el default).
-        # NO usar WindowsSelectorEventLoopPolicy — eso rompe subprocess en Playwright.
-        if sys.platform == "win32":
-            import asyncio
-            # Forzar ProactorEventLoop explícitamente (el correcto para Windows)
-            asyncio.set_event_loop_policy(asyncio.WindowsProactorEventLoopPolicy())
-            loop = asyncio.ProactorEventLoop()
-            asyncio.set_event_loop(loop)
-
-        self._pw      = sync_playwright().__enter__()
-        self._browser = self._pw.chromium.launch(
+        if self.ruta_diario:
+            self._diario = Path(self.ruta_diario).open("a", encoding="utf-8")
+        if self.ruta_cache:
+            self._cache = shelve.open(self.ruta_cache)
+            log.info(f"   💾  Caché de perfiles: {self.ruta_cache} ({len(self._cache)} entradas)")
+
+        self._pw      = await async_playwright().start()
+        self._browser = await self._pw.chromium.launch(
             headless=self.headless,
             args=[
                 "--no-sandbox",
@@ -166,108 +413,241 @@ class ScraperDoctoralia:
                 "--disable-blink-features=AutomationControlled",
             ],
         )
-        self._context = self._browser.new_context(
+        self._context = await self._browser.new_context(
             locale="es-MX",
             timezone_id="America/Mexico_City",
-            user_agent=(
-                "Mozilla/5.0 (Windows NT 10.0; Win64; x64) "
-                "AppleWebKit/537.36 (KHTML, like Gecko) "
-                "Chrome/120.0.0.0 Safari/537.36"
-            ),
+            user_agent=USER_AGENT,
             viewport={"width": 1366, "height": 768},
         )
-        # Bloquear recursos pesados para mayor velocidad
-        self._context.route(
-            "**/*.{png,jpg,jpeg,gif,webp,svg,woff,woff2,ttf,eot}",
-            lambda r: r.abort()
+        # Bloquear recursos pesados y rastreadores para mayor velocidad
+        await self._context.route("**/*", self._filtrar_recurso)
+        # Pool de páginas: cada tarea toma una, navega y la devuelve
+        self._paginas = asyncio.Queue()
+        for _ in range(self.concurrencia):
+            self._paginas.put_nowait(await self._context.new_page())
+        log.info(f"   🎭  Playwright iniciado (Chromium headless, {self.concurrencia} páginas).")
+
+        if httpx and HTMLParser:
+            try:
+                self._http = self._crear_cliente_http(http2=True)
+            except ImportError:
+                # http2=True requiere el paquete h2
+                self._http = self._crear_cliente_http(http2=False)
+            log.info("   ⚡  Perfiles vía HTTP (httpx + selectolax), Playwright como respaldo.")
+        else:
+            log.info("   ℹ️  httpx/selectolax no instalados — perfiles vía Playwright.")
+
+    @staticmethod
+    async def _filtrar_recurso(route):
+        """Aborta imágenes, fuentes, CSS, media y analítica; deja pasar el resto."""
+        request = route.request
+        if (request.resource_type in RECURSOS_BLOQUEADOS
+                or any(d in request.url for d in DOMINIOS_RASTREO)):
+            await route.abort()
+        else:
+            await route.continue_()
+
+    def _crear_cliente_http(self, http2: bool):
+        return httpx.AsyncClient(
+            http2=http2,
+            limits=httpx.Limits(max_connections=20, max_keepalive_connections=20),
+            headers={
+                "User-Agent":      USER_AGENT,
+                "Accept-Language": "es-MX,es;q=0.9",
+            },
+            timeout=20.0,
+            follow_redirects=True,
         )
-        self._page = self._context.new_page()
-        log.info("   🎭  Playwright iniciado (Chromium headless).")
 
-    def cerrar(self):
+    async def cerrar(self):
+        if self._diario:
+            self._diario.close()
+        if self._cache is not None:
+            self._cache.close()
+        try:
+            if self._http:
+                await self._http.aclose()
+        except Exception:
+            pass
         try:
             if self._browser:
-                self._browser.close()
+                await self._browser.close()
         except Exception:
             pass
         try:
-            if hasattr(self, "_pw") and self._pw:
-                self._pw.stop()
+            if self._pw:
+                await self._pw.stop()
         except Exception:
             pass
 
-    # ── Extracción por nicho ─────────────────────────────────────────────────
+    async def _goto(self, page, url: str):
+        """Navega respetando el intervalo mínimo por dominio."""
+        await self._limitador.esperar()
+        self._visitas[page] = self._visitas.get(page, 0) + 1
+        await page.goto(url, wait_until="domcontentloaded", timeout=20_000)
 
-    def extraer_nicho(self, nicho: dict, max_leads: int = 50) -> list[dict]:
-        """Extrae todos los leads de un nicho de Doctoralia."""
-        log.info(f"\n   🏥  Extrayendo nicho: {nicho['label']}")
-        log.info(f"   URL base: {nicho['url']}")
+    async def _devolver_pagina(self, page):
+        """
+        Regresa una página al pool. Tras RECICLAR_PAGINA navegaciones se cierra y
+        se sustituye por una nueva: Chromium acumula heap JS y listeners en
+        páginas muy usadas y cada goto se vuelve más lento.
+        """
+        if self._visitas.get(page, 0) >= self.RECICLAR_PAGINA:
+            try:
+                nueva = await self._context.new_page()
+            except Exception as exc:
+                log.debug(f"   No se pudo reciclar la página: {exc}")
+            else:
+                self._visitas.pop(page, None)
+                try:
+                    await page.close()
+                except Exception:
+                    pass
+                page = nueva
+        self._paginas.put_nowait(page)
 
-        links_perfiles = self._recolectar_links(nicho["url"], max_leads)
-        log.info(f"   Perfiles encontrados: {len(links_perfiles)}")
+    # ── Extracción por nicho ─────────────────────────────────────────────────
 
-        leads = []
-        for i, link in enumerate(links_perfiles, 1):
+    async def extraer_todos(self, pendientes: list[tuple[dict, int]],
+                            omitir: Optional[set] = None) -> list[dict]:
+        """
+        Extrae los leads de varios nichos de Doctoralia en dos fases:
+            1. Recorre los listados de todos los nichos (en paralelo) y une los
+               links: un perfil listado en varios nichos se visita una sola vez
+            2. Descarga los perfiles únicos; cada lead lleva en `nichos` todos los
+               nichos donde apareció (el primero es su `nicho` principal)
+        `pendientes` son pares (nicho, máx. leads). Los perfiles en `omitir`
+        (ya extraídos en una ejecución previa) no se visitan.
+        """
+        omitir    = omitir or set()
+        self._hoy = datetime.now().strftime("%Y-%m-%d")
+        for nicho, _ in pendientes:
+            log.info(f"\n   🏥  Recolectando nicho: {nicho['label']}")
+            log.info(f"   URL base: {nicho['url']}")
+
+        listados = await asyncio.gather(*(
+            self._recolectar_links(nicho["url"], max_leads, omitir)
+            for nicho, max_leads in pendientes
+        ))
+
+        # url → nichos donde aparece, en el orden de NICHOS_DOCTORALIA
+        nichos_por_url: dict[str, list[dict]] = {}
+        for (nicho, _), links in zip(pendientes, listados):
+            log.info(f"   {nicho['label']}: {len(links)} perfiles encontrados.")
+            for link in links:
+                nichos_por_url.setdefault(link, []).append(nicho)
+
+        total = len(nichos_por_url)
+        log.info(f"   Perfiles únicos entre nichos: {total} (de {sum(map(len, listados))})")
+
+        async def _extraer_con_slot(i: int, link: str, nichos: list[dict]) -> Optional[dict]:
+            # Perfil en caché: no se navega ni se espera el delay de cortesía
             try:
-                lead = self._extraer_perfil(link, nicho)
+                datos = self._leer_cache(link)
+                lead  = self._construir_lead(datos, link, nichos) if datos else None
                 if lead:
-                    leads.append(lead)
-                    tel = lead.get("telefono") or "sin tel"
-                    log.info(f"   [{i:>3}/{len(links_perfiles)}] ✅  {lead.get('empresa', '?')[:40]:<40} {tel}")
-                else:
-                    log.debug(f"   [{i:>3}] ⚠️  Perfil vacío: {link}")
+                    self._anexar_diario(lead)
+                    log.info(f"   [{i:>3}/{total}] 💾  {(lead.get('empresa') or '?')[:40]:<40} (caché)")
+                    return lead
             except Exception as exc:
-                log.warning(f"   [{i:>3}] ❌  Error en {link}: {exc}")
-            finally:
-                time.sleep(random.uniform(self.BASE_DELAY_MIN, self.BASE_DELAY_MAX))
+                log.warning(f"   [{i:>3}] ❌  Error en {link} (caché): {exc}")
+                return None
 
-        log.info(f"   ✅  {nicho['label']}: {len(leads)} leads extraídos.")
+            async with self._slots:
+                try:
+                    lead = await self._extraer_perfil(link, nichos)
+                    if lead:
+                        self._anexar_diario(lead)
+                        tel = lead.get("telefono") or "sin tel"
+                        log.info(f"   [{i:>3}/{total}] ✅  {(lead.get('empresa') or '?')[:40]:<40} {tel}")
+                    else:
+                        log.debug(f"   [{i:>3}] ⚠️  Perfil vacío: {link}")
+                    return lead
+                except Exception as exc:
+                    log.warning(f"   [{i:>3}] ❌  Error en {link}: {exc}")
+                    return None
+                finally:
+                    await asyncio.sleep(random.uniform(self.BASE_DELAY_MIN, self.BASE_DELAY_MAX))
+
+        resultados = await asyncio.gather(*(
+            _extraer_con_slot(i, link, nichos)
+            for i, (link, nichos) in enumerate(nichos_por_url.items(), 1)
+        ))
+        leads = [lead for lead in resultados if lead]
+
+        log.info(f"   ✅  Doctoralia: {len(leads)} leads extraídos.")
         return leads
 
-    def _recolectar_links(self, url_base: str, max_links: int) -> list:
+    def _leer_cache(self, url: str) -> Optional[dict]:
+        """Datos del perfil guardados en una ejecución previa, si no han caducado."""
+        if self._cache is None:
+            return None
+        entrada = self._cache.get(url)
+        if entrada and entrada["_ts"] > time.time() - self.CACHE_TTL:
+            return entrada["datos"]
+        return None
+
+    def _guardar_cache(self, url: str, datos: dict):
+        if self._cache is not None:
+            self._cache[url] = {"_ts": time.time(), "datos": datos}
+
+    def _anexar_diario(self, lead: dict):
+        """Persiste el lead de inmediato (una línea JSON) para poder reanudar."""
+        if self._diario:
+            self._diario.write(json.dumps(lead, ensure_ascii=False) + "\n")
+            self._diario.flush()
+
+    async def _recolectar_links(self, url_base: str, max_links: int, omitir: set) -> list:
         """
         Recorre las páginas de listado y recolecta los links a perfiles individuales.
         """
         links  = []
+        vistos = set(omitir)
         url    = url_base
         pagina = 1
 
-        while url and pagina <= self.MAX_PAGINAS and len(links) < max_links:
-            try:
-                log.debug(f"   Página {pagina}: {url}")
-                self._page.goto(url, wait_until="domcontentloaded", timeout=20_000)
-                time.sleep(random.uniform(1.5, 3.0))
-
-                # Buscar links a perfiles — múltiples selectores por si cambia el HTML
-                nuevos = self._extraer_links_pagina()
-                if not nuevos:
-                    log.debug(f"   Sin resultados en página {pagina} — terminando paginación.")
-                    break
+        page = await self._paginas.get()
+        try:
+            while url and pagina <= self.MAX_PAGINAS and len(links) < max_links:
+                try:
+                    log.debug(f"   Página {pagina}: {url}")
+                    await self._goto(page, url)
+                    # Doctoralia pinta los resultados con JS: esperar a que exista
+                    # el primer link de perfil en vez de dormir un tiempo fijo
+                    try:
+                        await page.wait_for_selector(self.SEL_LINK_PERFIL, timeout=8_000)
+                    except Exception:
+                        pass
+
+                    # Buscar links a perfiles — múltiples selectores por si cambia el HTML
+                    nuevos = await self._extraer_links_pagina(page)
+                    if not nuevos:
+                        log.debug(f"   Sin resultados en página {pagina} — terminando paginación.")
+                        break
 
-                links.extend(l for l in nuevos if l not in links)
-                log.debug(f"   Página {pagina}: {len(nuevos)} perfiles nuevos (total: {len(links)})")
+                    for link in nuevos:
+                        if link not in vistos:
+                            vistos.add(link)
+                            links.append(link)
+                    log.debug(f"   Página {pagina}: {len(nuevos)} perfiles nuevos (total: {len(links)})")
 
-                # Siguiente página
-                url    = self._get_siguiente_pagina()
-                pagina += 1
+                    # Siguiente página (con pausa de cortesía entre listados)
+                    url    = await self._get_siguiente_pagina(page)
+                    pagina += 1
+                    if url:
+                        await asyncio.sleep(random.uniform(1.5, 3.0))
 
-            except Exception as exc:
-                log.warning(f"   Error en página {pagina}: {exc}")
-                break
+                except Exception as exc:
+                    log.warning(f"   Error en página {pagina}: {exc}")
+                    break
+        finally:
+            await self._devolver_pagina(page)
 
         return links[:max_links]
 
-    def _extraer_links_pagina(self) -> list:
-        """Extrae todos los links a perfiles en la página actual."""
-        links  = []
-        vistos = set()
-
-        # Esperar carga dinámica (Doctoralia usa React/JS)
-        try:
-            self._page.wait_for_load_state("networkidle", timeout=10_000)
-        except Exception:
-            pass
-        time.sleep(1.5)  # pausa extra para JS dinámico
+    async def _extraer_links_pagina(self, page) -> list:
+        """Extrae los links a perfiles de la página actual (únicos, en orden de aparición)."""
+        links: dict[str, None] = {}
 
         try:
             # Selectores reales de Doctoralia /buscar (estructura Feb 2026)
@@ -289,9 +669,9 @@ class ScraperDoctoralia:
 
             for sel in selectores:
                 try:
-                    elementos = self._page.query_selector_all(sel)
+                    elementos = await page.query_selector_all(sel)
                     for el in elementos:
-                        href = el.get_attribute("href") or ""
+                        href = await el.get_attribute("href") or ""
                         # Filtrar solo links de perfil individual
                         # Formato Doctoralia: /dr-nombre-apellido,ciudad.html
                         if (href and
@@ -301,18 +681,17 @@ class ScraperDoctoralia:
                             (href.endswith(".html") and "/dr-" in href)):
                             url_completa = (href if href.startswith("http")
                                           else f"https://www.doctoralia.com.mx{href}")
-                            if url_completa not in vistos and "doctoralia.com.mx" in url_completa:
-                                vistos.add(url_completa)
-                                links.append(url_completa)
+                            if "doctoralia.com.mx" in url_completa:
+                                links[url_completa] = None
                 except Exception:
                     continue
 
             if not links:
                 log.debug("   Sin links con selectores específicos.")
-                log.debug(f"   URL actual: {self._page.url}")
-                log.debug(f"   Título: {self._page.title()}")
+                log.debug(f"   URL actual: {page.url}")
+                log.debug(f"   Título: {await page.title()}")
                 # Mostrar todos los hrefs encontrados para diagnóstico
-                todos_hrefs = self._page.eval_on_selector_all(
+                todos_hrefs = await page.eval_on_selector_all(
                     "a[href]",
                     "els => els.map(e => e.href).filter(h => h.includes('doctoralia')).slice(0, 20)"
                 )
@@ -320,9 +699,9 @@ class ScraperDoctoralia:
 
         except Exception as exc:
             log.debug(f"   Error extrayendo links: {exc}")
-        return links
+        return list(links)
 
-    def _get_siguiente_pagina(self) -> Optional[str]:
+    async def _get_siguiente_pagina(self, page) -> Optional[str]:
         """Busca el link a la siguiente página."""
         try:
             selectores = [
@@ -333,221 +712,202 @@ class ScraperDoctoralia:
                 "a[data-testid='pagination-next']",
             ]
             for sel in selectores:
-                el = self._page.query_selector(sel)
+                el = await page.query_selector(sel)
                 if el:
-                    href = el.get_attribute("href")
+                    href = await el.get_attribute("href")
                     if href:
                         return href if href.startswith("http") else f"https://www.doctoralia.com.mx{href}"
         except Exception:
             pass
         return None
 
-    def _extraer_perfil(self, url: str, nicho: dict) -> Optional[dict]:
+    async def _extraer_perfil(self, url: str, nichos: list[dict]) -> Optional[dict]:
         """
-        Visita la página de perfil individual y extrae todos los datos disponibles.
+        Descarga la página de perfil individual y extrae todos los datos disponibles.
+        Usa HTTP + selectolax cuando es posible; si el HTML no trae teléfono
+        (suele generarse con JS), recurre a una página de Playwright y completa
+        con ella lo que el HTML no tenía.
         """
         try:
-            self._page.goto(url, wait_until="domcontentloaded", timeout=20_000)
-            time.sleep(random.uniform(1.0, 2.0))
-
-            # ── Nombre ────────────────────────────────────────────────────────
-            nombre = self._get_text_multi([
-                "h1[itemprop='name']",
-                "h1.doctor-name",
-                "h1",
-                "span[itemprop='name']",
-            ])
-
-            # ── Teléfono ──────────────────────────────────────────────────────
-            telefono = self._extraer_telefono()
-
-            # ── Consultorio / Clínica ─────────────────────────────────────────
-            consultorio = self._get_text_multi([
-                "span[itemprop='name'][itemtype*='MedicalClinic']",
-                "div.office-name",
-                "h2.office-name",
-                "p.clinic-name",
-                "div[data-testid='office-name']",
-            ])
-
-            # ── Dirección ─────────────────────────────────────────────────────
-            direccion = self._get_text_multi([
-                "span[itemprop='streetAddress']",
-                "div.address",
-                "p.address",
-                "address",
-            ])
-
-            # ── Colonia / Delegación ──────────────────────────────────────────
-            colonia = self._get_text_multi([
-                "span[itemprop='addressLocality']",
-                "span.locality",
-                "div.neighborhood",
-            ])
-            delegacion = self._inferir_delegacion(direccion or colonia or "")
-
-            # ── Especialidades ────────────────────────────────────────────────
-            especialidades = self._extraer_especialidades()
-
-            # ── Sitio web ─────────────────────────────────────────────────────
-            sitio_web = self._get_attr_multi([
-                "a[itemprop='url']",
-                "a[data-testid='website-link']",
-                "a.website-link",
-            ], "href")
-
-            # ── Validar: al menos nombre o teléfono ───────────────────────────
-            if not nombre and not telefono:
-                return None
+            datos = await self._datos_perfil_http(url)
+            if not datos or not datos["telefono"]:
+                page = await self._paginas.get()
+                try:
+                    datos_js = await self._datos_perfil_navegador(page, url)
+                except Exception as exc:
+                    if not datos:
+                        raise
+                    log.debug(f"   Playwright falló en {url}, se usa el HTML: {exc}")
+                    datos_js = {}
+                finally:
+                    await self._devolver_pagina(page)
+                if datos:
+                    datos = {**datos, **{k: v for k, v in datos_js.items() if v}}
+                else:
+                    datos = datos_js
+            # Se guardan los datos crudos (no el lead) para que el mismo perfil
+            # pueda reconstruirse con otro nicho y fecha de extracción
+            lead = self._construir_lead(datos, url, nichos)
+            if lead:
+                self._guardar_cache(url, datos)
+            return lead
 
-            # ── Filtrar por CDMX ──────────────────────────────────────────────
-            KEYWORDS_CDMX = [
-                "ciudad de méxico", "cdmx", "df", "distrito federal",
-                "iztapalapa", "coyoacán", "benito juárez", "cuauhtémoc",
-                "miguel hidalgo", "tlalpan", "xochimilco", "azcapotzalco",
-                "iztacalco", "gustavo a. madero", "venustiano carranza",
-                "tláhuac", "milpa alta", "álvaro obregón", "cuajimalpa",
-                "magdalena contreras", "narvarte", "condesa", "roma norte",
-                "roma sur", "polanco", "del valle", "pedregal", "coyoacan",
-            ]
-            texto_dir = (direccion or "").lower() + " " + (colonia or "").lower()
+        except Exception as exc:
+            log.debug(f"   Error extrayendo perfil {url}: {exc}")
+            return None
 
-            # Verificar keywords de CDMX
-            es_cdmx = any(k in texto_dir for k in KEYWORDS_CDMX)
+    async def _datos_perfil_http(self, url: str) -> Optional[dict]:
+        """Descarga el perfil sin navegador y lo parsea con selectolax."""
+        if not self._http:
+            return None
+        try:
+            await self._limitador.esperar()
+            resp = await self._http.get(url)
+            resp.raise_for_status()
+        except Exception as exc:
+            log.debug(f"   HTTP falló para {url}: {exc} — usando Playwright.")
+            return None
 
-            # Verificar código postal CDMX: 01000–16999
-            if not es_cdmx:
-                cp_match = re.search(r'\b(0[1-9]\d{3}|1[0-6]\d{3})\b', direccion or "")
-                es_cdmx = bool(cp_match)
+        tree = HTMLParser(resp.text)
+        tree.strip_tags(["script", "style", "noscript"])
+        return {
+            "nombre":         self._html_text_multi(tree, self.SEL_NOMBRE),
+            "telefono":       self._html_telefono(tree),
+            "consultorio":    self._html_text_multi(tree, self.SEL_CONSULTORIO),
+            "direccion":      self._html_text_multi(tree, self.SEL_DIRECCION),
+            "colonia":        self._html_text_multi(tree, self.SEL_COLONIA),
+            "especialidades": self._html_especialidades(tree),
+            "sitio_web":      self._html_attr_multi(tree, self.SEL_SITIO_WEB, "href"),
+        }
 
-            if not es_cdmx:
-                log.debug(f"   ⚠️  Filtrado (no CDMX): {nombre} — {direccion}")
-                return None
+    async def _datos_perfil_navegador(self, page, url: str) -> dict:
+        """Visita el perfil con Playwright (respaldo para contenido dinámico)."""
+        await self._goto(page, url)
+        await asyncio.sleep(random.uniform(1.0, 2.0))
 
-            return {
-                "empresa":          consultorio or nombre,
-                "nombre_contacto":  nombre,
-                "cargo":            f"{nicho['especialidad']} — {', '.join(especialidades[:2]) if especialidades else ''}".rstrip(" — "),
-                "telefono":         normalizar_telefono(telefono),
-                "email":            None,   # Doctoralia no expone emails públicamente
-                "linkedin":         None,
-                "sitio_web":        sitio_web,
-                "colonia":          colonia,
-                "delegacion":       delegacion,
-                "direccion_raw":    direccion,
-                "especialidades":   especialidades,
-                "nicho":            nicho["nicho"],
-                "url_perfil":       url,
-                "fuente":           "Doctoralia",
-                "fecha_extraccion": datetime.now().strftime("%Y-%m-%d"),
-            }
+        # Todos los campos en una sola evaluación dentro de la página
+        crudo = await page.evaluate(_JS_DATOS_PERFIL, self.SELECTORES_PERFIL)
 
-        except Exception as exc:
-            log.debug(f"   Error extrayendo perfil {url}: {exc}")
+        # Teléfono: 1. link tel:  2. itemprop telephone  3. regex sobre texto visible
+        if crudo["telefono_href"]:
+            telefono = crudo["telefono_href"].replace("tel:", "").strip()
+        elif crudo["telefono_prop"]:
+            telefono = crudo["telefono_prop"].strip()
+        else:
+            telefono = _buscar_telefono_en_texto(crudo["texto"] or "")
+
+        return {
+            "nombre":         crudo["nombre"],
+            "telefono":       telefono,
+            "consultorio":    crudo["consultorio"],
+            "direccion":      crudo["direccion"],
+            "colonia":        crudo["colonia"],
+            "especialidades": crudo["especialidades"],
+            "sitio_web":      crudo["sitio_web"],
+        }
+
+    def _construir_lead(self, datos: dict, url: str, nichos: list[dict]) -> Optional[dict]:
+        """
+        Valida los datos crudos de un perfil, filtra por CDMX y arma el lead.
+        `nichos` son todos los nichos donde aparece el perfil; el primero manda.
+        """
+        nicho          = nichos[0]
+        nombre         = datos["nombre"]
+        telefono       = datos["telefono"]
+        consultorio    = datos["consultorio"]
+        direccion      = datos["direccion"]
+        colonia        = datos["colonia"]
+        especialidades = datos["especialidades"]
+        sitio_web      = datos["sitio_web"]
+        delegacion     = self._inferir_delegacion(direccion or colonia or "")
+
+        # ── Validar: al menos nombre o teléfono ───────────────────────────
+        if not nombre and not telefono:
+            return None
+
+        # ── Filtrar por CDMX ──────────────────────────────────────────────
+        # Primero el código postal CDMX (01000–16999), que es lo más barato;
+        # solo si no aparece se buscan keywords en dirección + colonia
+        es_cdmx = bool(_CP_CDMX.search(direccion or "")) or bool(
+            _RE_CDMX.search(f"{direccion or ''} {colonia or ''}")
+        )
+
+        if not es_cdmx:
+            log.debug(f"   ⚠️  Filtrado (no CDMX): {nombre} — {direccion}")
             return None
 
-    def _extraer_telefono(self) -> Optional[str]:
+        return _puntuar({
+            "empresa":          consultorio or nombre,
+            "nombre_contacto":  nombre,
+            "cargo":            f"{nicho['especialidad']} — {', '.join(especialidades[:2]) if especialidades else ''}".rstrip(" — "),
+            "telefono":         normalizar_telefono(telefono),
+            "email":            None,   # Doctoralia no expone emails públicamente
+            "linkedin":         None,
+            "sitio_web":        sitio_web,
+            "colonia":          colonia,
+            "delegacion":       delegacion,
+            "direccion_raw":    direccion,
+            "especialidades":   especialidades,
+            "nicho":            nicho["nicho"],
+            "nichos":           [n["nicho"] for n in nichos],
+            "url_perfil":       url,
+            "fuente":           "Doctoralia",
+            "fecha_extraccion": self._hoy,
+            "_norm_nombre":     _normalizar_nombre(nombre),
+        })
+
+    # ── Extracción sobre HTML estático (selectolax) ──────────────────────────
+
+    def _html_telefono(self, tree) -> Optional[str]:
         """
         Intenta extraer teléfono por múltiples métodos:
         1. Link tel:
         2. Atributo itemprop
         3. Regex sobre el texto visible
         """
-        # Método 1: link tel:
-        try:
-            el = self._page.query_selector("a[href^='tel:']")
-            if el:
-                href = el.get_attribute("href") or ""
-                return href.replace("tel:", "").strip()
-        except Exception:
-            pass
-
-        # Método 2: itemprop telephone
-        try:
-            el = self._page.query_selector("span[itemprop='telephone'], meta[itemprop='telephone']")
-            if el:
-                return (el.get_attribute("content") or el.inner_text() or "").strip()
-        except Exception:
-            pass
-
-        # Método 3: regex sobre texto visible de la página
-        try:
-            texto = self._page.inner_text("body")
-            # Patrones de teléfonos mexicanos
-            patrones = [
-                r"\+52\s?[\d\s\-]{10,14}",
-                r"55\s?\d{4}\s?\d{4}",     # CDMX con lada 55
-                r"\(\s?55\s?\)\s?\d{4}[\s\-]\d{4}",
-                r"\d{2,3}[\s\-]\d{4}[\s\-]\d{4}",
-            ]
-            for patron in patrones:
-                match = re.search(patron, texto)
-                if match:
-                    return match.group().strip()
-        except Exception:
-            pass
-
-        return None
-
-    def _extraer_especialidades(self) -> list:
-        """Extrae la lista de especialidades del perfil."""
-        try:
-            selectores = [
-                "span.specialization",
-                "li.specialization",
-                "div[data-testid='specialization']",
-                "ul.specializations li",
-            ]
-            for sel in selectores:
-                elementos = self._page.query_selector_all(sel)
-                if elementos:
-                    return [el.inner_text().strip() for el in elementos if el.inner_text().strip()]
-        except Exception:
-            pass
+        el = tree.css_first("a[href^='tel:']")
+        if el:
+            return (el.attributes.get("href") or "").replace("tel:", "").strip()
+
+        el = tree.css_first("span[itemprop='telephone'], meta[itemprop='telephone']")
+        if el:
+            return (el.attributes.get("content") or el.text(strip=True) or "").strip()
+
+        texto = tree.body.text(separator=" ") if tree.body else ""
+        return _buscar_telefono_en_texto(texto)
+
+    def _html_especialidades(self, tree) -> list:
+        for sel in self.SEL_ESPECIALIDADES:
+            textos = [n.text(separator=" ", strip=True) for n in tree.css(sel)]
+            if textos:
+                return [t for t in textos if t]
         return []
 
-    def _get_text_multi(self, selectores: list) -> Optional[str]:
-        """Intenta múltiples selectores y devuelve el primero que encuentre texto."""
+    def _html_text_multi(self, tree, selectores: list) -> Optional[str]:
         for sel in selectores:
-            try:
-                el = self._page.query_selector(sel)
-                if el:
-                    texto = el.inner_text().strip()
-                    if texto:
-                        return texto
-            except Exception:
-                continue
+            el = tree.css_first(sel)
+            if el:
+                texto = el.text(separator=" ", strip=True)
+                if texto:
+                    return texto
         return None
 
-    def _get_attr_multi(self, selectores: list, attr: str) -> Optional[str]:
-        """Intenta múltiples selectores para obtener un atributo."""
+    def _html_attr_multi(self, tree, selectores: list, attr: str) -> Optional[str]:
         for sel in selectores:
-            try:
-                el = self._page.query_selector(sel)
-                if el:
-                    val = el.get_attribute(attr)
-                    if val:
-                        return val
-            except Exception:
-                continue
+            el = tree.css_first(sel)
+            if el:
+                val = el.attributes.get(attr)
+                if val:
+                    return val
         return None
 
     def _inferir_delegacion(self, texto: str) -> Optional[str]:
         """Infiere la alcaldía/delegación de CDMX desde un texto de dirección."""
-        ALCALDIAS = [
-            "Álvaro Obregón", "Azcapotzalco", "Benito Juárez", "Coyoacán",
-            "Cuajimalpa", "Cuauhtémoc", "Gustavo A. Madero", "Iztacalco",
-            "Iztapalapa", "Magdalena Contreras", "Miguel Hidalgo", "Milpa Alta",
-            "Tláhuac", "Tlalpan", "Venustiano Carranza", "Xochimilco",
-            # Nombres cortos/populares
-            "Álvaro Obregón", "GAM", "Benito Juárez", "Del Valle",
-            "Polanco", "Condesa", "Roma", "Coyoacán", "Tlalpan",
-        ]
-        texto_lower = texto.lower()
-        for alc in ALCALDIAS:
-            if alc.lower() in texto_lower:
-                return alc
-        return None
+        if _AUTOMATA_ALCALDIAS is not None:
+            encontradas = [valor for _, valor in _AUTOMATA_ALCALDIAS.iter(texto.lower())]
+        else:
+            encontradas = [_ALCALDIA_POR_TEXTO[m.group().lower()] for m in _RE_ALCALDIAS.finditer(texto)]
+        return min(encontradas)[1] if encontradas else None
 
 
 # ════════════════════════════════════════════════════════════════════════════
@@ -581,12 +941,31 @@ class EnriquecedorPhantombuster:
         self.agent_id  = os.getenv("PHANTOMBUSTER_AGENT_ID", "").strip()
         self.li_cookie = os.getenv("LINKEDIN_SESSION_COOKIE", "").strip()
         self.disponible = bool(self.api_key and self.agent_id)
+        self.session    = None
 
         if not self.disponible:
             log.warning("⚠️  Phantombuster no configurado — se omitirá enriquecimiento.")
             log.warning("   Para activar:")
             log.warning("   export PHANTOMBUSTER_API_KEY='tu_api_key'")
             log.warning("   export PHANTOMBUSTER_AGENT_ID='tu_agent_id'")
+            return
+
+        # Import diferido: --mock y --solo-doctoralia nunca cargan requests
+        try:
+            import requests
+            from requests.adapters import HTTPAdapter
+        except ImportError:
+            log.error("❌  requests no instalado: pip install requests")
+            self.disponible = False
+            return
+
+        # Sesión compartida: launch + todos los polls reutilizan la misma conexión TLS
+        self.session = requests.Session()
+        self.session.headers.update({
+            "X-Phantombuster-Key": self.api_key,
+            "Content-Type": "application/json",
+        })
+        self.session.mount("https://", HTTPAdapter(pool_connections=4, pool_maxsize=8))
 
     def enriquecer_lote(self, leads: list[dict], max_enriquecer: int = 50) -> list[dict]:
         """
@@ -610,17 +989,6 @@ class EnriquecedorPhantombuster:
 
         log.info(f"🔍  [Phantombuster] Enriqueciendo {len(candidatos)} perfiles vía LinkedIn...")
 
-        try:
-            import requests
-        except ImportError:
-            log.error("❌  requests no instalado: pip install requests")
-            return leads
-
-        headers = {
-            "X-Phantombuster-Key": self.api_key,
-            "Content-Type": "application/json",
-        }
-
         # Construir lista de búsquedas para el agente
         # El agente LinkedIn Profile Scraper acepta nombres o URLs de LinkedIn
         busquedas = []
@@ -642,9 +1010,8 @@ class EnriquecedorPhantombuster:
                     "extractDefaultUrl":  True,
                 },
             }
-            resp = requests.post(
+            resp = self.session.post(
                 f"{self.API_BASE}/agents/launch",
-                headers=headers,
                 json=payload,
                 timeout=30,
             )
@@ -656,7 +1023,7 @@ class EnriquecedorPhantombuster:
             return leads
 
         # Esperar a que el agente termine (polling)
-        resultados_pb = self._esperar_resultado(container_id, headers)
+        resultados_pb = self._esperar_resultado(container_id)
 
         if not resultados_pb:
             log.warning("   ⚠️  Phantombuster no devolvió resultados.")
@@ -667,22 +1034,28 @@ class EnriquecedorPhantombuster:
         log.info(f"   ✅  Phantombuster: {len(resultados_pb)} perfiles procesados.")
         return leads_enriquecidos
 
-    def _esperar_resultado(self, container_id: str, headers: dict,
-                           max_espera: int = 300, intervalo: int = 15) -> list[dict]:
+    UMBRAL_FUZZY = 90    # score mínimo (token_set_ratio) para aceptar un nombre de LinkedIn
+
+    POLL_INICIAL = 5     # segundos antes del primer reintento
+    POLL_FACTOR  = 1.5   # crecimiento exponencial entre consultas
+    POLL_MAXIMO  = 30    # tope de espera entre consultas
+
+    def _esperar_resultado(self, container_id: str, max_espera: int = 300) -> list[dict]:
         """
         Hace polling a la API de Phantombuster hasta que el agente termina.
+        Espera entre consultas con backoff exponencial (5s, 7.5s, 11s… hasta 30s)
+        y ±20% de jitter: detecta pronto los agentes rápidos sin saturar la API
+        con los lentos.
         Timeout: 5 minutos (suficiente para plan gratuito).
         """
-        import requests
-
         log.info(f"   ⏳  Esperando resultado del agente (máx {max_espera}s)...")
         tiempo_inicio = time.time()
+        espera        = self.POLL_INICIAL
 
         while time.time() - tiempo_inicio < max_espera:
             try:
-                resp = requests.get(
+                resp = self.session.get(
                     f"{self.API_BASE}/containers/fetch-output",
-                    headers=headers,
                     params={"id": container_id},
                     timeout=20,
                 )
@@ -698,15 +1071,7 @@ class EnriquecedorPhantombuster:
                         output_raw = data.get("output", "[]")
                         try:
                             if isinstance(output_raw, str):
-                                # JSON Lines → parsear línea por línea
-                                lineas = [l for l in output_raw.strip().split("\n") if l.strip()]
-                                resultados = []
-                                for linea in lineas:
-                                    try:
-                                        resultados.append(json.loads(linea))
-                                    except Exception:
-                                        pass
-                                return resultados
+                                return self._parsear_json_lines(output_raw)
                             elif isinstance(output_raw, list):
                                 return output_raw
                         except Exception as exc:
@@ -718,38 +1083,116 @@ class EnriquecedorPhantombuster:
             except Exception as exc:
                 log.warning(f"   Error consultando estado: {exc}")
 
-            time.sleep(intervalo)
+            restante = max_espera - (time.time() - tiempo_inicio)
+            time.sleep(max(0.0, min(espera * random.uniform(0.8, 1.2), restante)))
+            espera = min(espera * self.POLL_FACTOR, self.POLL_MAXIMO)
 
         log.warning("   ⏰  Timeout esperando Phantombuster.")
         return []
 
+    @staticmethod
+    def _parsear_json_lines(texto: str) -> list:
+        """
+        Decodifica una secuencia de objetos JSON (JSON Lines) con un único
+        decodificador que avanza sobre el buffer, sin partirlo en líneas.
+        Un registro corrupto se salta hasta el siguiente salto de línea.
+        """
+        decoder    = json.JSONDecoder()
+        resultados = []
+        idx, fin   = 0, len(texto)
+        while idx < fin:
+            while idx < fin and texto[idx] in " \t\r\n":
+                idx += 1
+            if idx >= fin:
+                break
+            try:
+                obj, idx = decoder.raw_decode(texto, idx)
+            except json.JSONDecodeError:
+                salto = texto.find("\n", idx)
+                idx = fin if salto == -1 else salto + 1
+                continue
+            if isinstance(obj, list):
+                resultados.extend(obj)
+            else:
+                resultados.append(obj)
+        return resultados
+
     def _aplicar_enriquecimiento(self, leads: list[dict],
                                   candidatos: list[dict],
                                   resultados_pb: list[dict]) -> list[dict]:
         """
         Aplica los datos de LinkedIn a los leads correspondientes.
-        Matching por nombre (fuzzy simple).
+        Matching por nombre: exacto sobre el nombre normalizado y, si no hay,
+        difuso con RapidFuzz (token_set_ratio ≥ 90) o por substring si no está instalado.
         """
-        # Crear índice de resultados por nombre normalizado
+        # Crear índice de resultados por nombre normalizado (una sola vez)
         idx_pb = {}
         for r in resultados_pb:
-            nombre_pb = (r.get("fullName") or r.get("name") or "").lower().strip()
+            nombre_pb = _normalizar_nombre(r.get("fullName") or r.get("name"))
             if nombre_pb:
                 idx_pb[nombre_pb] = r
 
+        if not idx_pb:
+            log.info("   ℹ️  Phantombuster no devolvió nombres utilizables — sin enriquecimiento.")
+            return leads
+
+        # Índice invertido de bigramas: solo se comparan nombres que comparten alguno
+        postings    = defaultdict(set)
+        n_bigramas  = {}                      # nombre → cuántos bigramas distintos tiene
+        orden_pb    = {n: i for i, n in enumerate(idx_pb)}
+        for nombre_pb in idx_pb:
+            bigramas = _bigramas(nombre_pb)
+            n_bigramas[nombre_pb] = len(bigramas)
+            for bg in bigramas:
+                postings[bg].add(nombre_pb)
+        # Nombres de 1 carácter: sin bigramas, no aparecen en postings
+        sin_bigramas = [n for n, c in n_bigramas.items() if not c]
+
         enriquecidos = 0
-        for lead in leads:
-            nombre_lead = (lead.get("nombre_contacto") or "").lower().strip()
+        for lead in (l for l in leads if l.get("nombre_contacto")):
+            nombre_lead = _nombre_normalizado(lead)
             if not nombre_lead:
                 continue
 
-            # Buscar match exacto primero, luego parcial
+            # Buscar match exacto primero, luego difuso
             datos_li = idx_pb.get(nombre_lead)
             if not datos_li:
-                # Match parcial: buscar si el nombre del lead está contenido en algún resultado
-                for nombre_pb, datos in idx_pb.items():
+                bigramas_lead = _bigramas(nombre_lead)
+                comunes = Counter()
+                for bg in bigramas_lead:
+                    comunes.update(postings.get(bg, ()))
+
+            if not datos_li and process:
+                # Sin prefiltro por longitud: token_set_ratio da 100 cuando los
+                # tokens de un nombre están contenidos en el otro, aunque uno
+                # sea mucho más largo ("psic. carlos mendoza ruiz" / "carlos mendoza")
+                if bigramas_lead:
+                    candidatos_fuzzy = sin_bigramas + list(comunes)
+                    candidatos_fuzzy.sort(key=orden_pb.__getitem__)
+                else:
+                    candidatos_fuzzy = list(idx_pb)
+                match = process.extractOne(
+                    nombre_lead, candidatos_fuzzy,
+                    scorer=fuzz.token_set_ratio, processor=None,
+                    score_cutoff=self.UMBRAL_FUZZY,
+                )
+                if match:
+                    datos_li = idx_pb[match[0]]
+            elif not datos_li:
+                # Sin RapidFuzz: el nombre del lead contenido en algún resultado (o al revés).
+                # Un substring comparte todos sus bigramas con el otro nombre, así que
+                # solo se verifican esos candidatos, en el orden original del índice
+                if bigramas_lead:
+                    candidatos_sub = sin_bigramas + [
+                        n for n, c in comunes.items()
+                        if c == n_bigramas[n] or c == len(bigramas_lead)
+                    ]
+                    candidatos_sub.sort(key=orden_pb.__getitem__)
+                else:
+                    candidatos_sub = idx_pb
+                for nombre_pb in candidatos_sub:
                     if nombre_lead in nombre_pb or nombre_pb in nombre_lead:
-                        datos_li = datos
+                        datos_li = idx_pb[nombre_pb]
                         break
 
             if datos_li:
@@ -764,6 +1207,7 @@ class EnriquecedorPhantombuster:
                     lead["empresa"] = datos_li.get("currentCompanyName")
 
                 lead["enriquecido_linkedin"] = True
+                _puntuar(lead)
                 enriquecidos += 1
 
         log.info(f"   ✅  Leads enriquecidos con LinkedIn: {enriquecidos}")
@@ -795,28 +1239,28 @@ def generar_leads_mock(max_leads: int = 20) -> list[dict]:
     ]
     nichos = ["psicologo", "psiquiatra", "terapeuta", "clinica_salud_mental"]
 
-    leads = []
-    for i in range(min(max_leads, len(nombres) * 2)):
-        nombre   = nombres[i % len(nombres)]
-        consult  = consultorios[i % len(consultorios)]
-        colonia, deleg = colonias[i % len(colonias)]
-        nicho    = nichos[i % len(nichos)]
-        telefono = f"+5255{random.randint(10000000, 99999999)}"
-
-        leads.append({
-            "empresa":          consult,
-            "nombre_contacto":  nombre,
+    _ri   = random.randint
+    hoy   = datetime.now().strftime("%Y-%m-%d")
+    n_nom, n_con, n_col, n_nic = len(nombres), len(consultorios), len(colonias), len(nichos)
+
+    leads = [
+        _puntuar({
+            "empresa":          consultorios[i % n_con],
+            "nombre_contacto":  nombres[i % n_nom],
             "cargo":            "Psicólogo / Director",
-            "telefono":         telefono,
+            "telefono":         f"+5255{_ri(10000000, 99999999)}",
             "email":            None,
             "linkedin":         None,
             "sitio_web":        None,
-            "colonia":          colonia,
-            "delegacion":       deleg,
-            "nicho":            nicho,
+            "colonia":          colonias[i % n_col][0],
+            "delegacion":       colonias[i % n_col][1],
+            "nicho":            nichos[i % n_nic],
             "fuente":           "Mock",
-            "fecha_extraccion": datetime.now().strftime("%Y-%m-%d"),
+            "fecha_extraccion": hoy,
+            "_norm_nombre":     _normalizar_nombre(nombres[i % n_nom]),
         })
+        for i in range(min(max_leads, n_nom * 2))
+    ]
 
     log.info(f"   ✅  {len(leads)} leads mock generados.")
     return leads
@@ -826,93 +1270,212 @@ def generar_leads_mock(max_leads: int = 20) -> list[dict]:
 # 4. UTILIDADES
 # ════════════════════════════════════════════════════════════════════════════
 
+def _buscar_telefono_en_texto(texto: str) -> Optional[str]:
+    """Busca un teléfono mexicano en texto libre (último recurso)."""
+    for patron in _TEL_PATTERNS:
+        match = patron.search(texto)
+        if match:
+            return match.group().strip()
+    return None
+
+
+@lru_cache(maxsize=8192)
+def _normalizar_nombre(nombre: Optional[str]) -> str:
+    """
+    Nombre en minúsculas, sin acentos ni espacios sobrantes, para comparar.
+    Memoizada: los mismos nombres de Phantombuster y de empresas se repiten
+    entre enriquecimiento y deduplicación.
+    """
+    if not nombre:
+        return ""
+    descompuesto = unicodedata.normalize("NFKD", nombre.casefold())
+    sin_acentos  = "".join(c for c in descompuesto if not unicodedata.combining(c))
+    return " ".join(sin_acentos.split())
+
+
+def _bigramas(texto: str) -> set:
+    return {texto[i:i + 2] for i in range(len(texto) - 1)}
+
+
+def _nombre_normalizado(lead: dict) -> str:
+    """
+    Nombre de contacto normalizado, calculado una sola vez por lead y guardado
+    en `_norm_nombre` (los campos con `_` no se escriben en la salida).
+    """
+    norm = lead.get("_norm_nombre")
+    if norm is None:
+        norm = lead["_norm_nombre"] = _normalizar_nombre(lead.get("nombre_contacto"))
+    return norm
+
+
+@lru_cache(maxsize=16384)
 def normalizar_telefono(tel: Optional[str]) -> Optional[str]:
+    """
+    Normaliza a +52XXXXXXXXXX. Memoizada (los mismos teléfonos se repiten entre
+    nichos, diario y enriquecimiento); devuelve cadenas internadas.
+    """
     if not tel:
         return None
-    limpio = re.sub(r"[^\d+]", "", str(tel))
-    if not limpio or len(limpio) < 7:
+    limpio = str(tel).translate(_TEL_TABLA)
+    if not limpio.isascii():
+        limpio = _TEL_NO_DIGITO.sub("", limpio)
+    largo = len(limpio)
+    if largo < 7:
         return None
-    if limpio.startswith("+52"):
+
+    if limpio[:3] == "+52":
         numero = limpio[3:]
-    elif limpio.startswith("52") and len(limpio) >= 12:
+    elif limpio[:2] == "52" and largo >= 12:
         numero = limpio[2:]
     else:
         numero = limpio.lstrip("0")
-    if len(numero) == 10:
-        return f"+52{numero}"
-    elif len(numero) == 8:
-        return f"+5255{numero}"
-    elif len(numero) > 10:
-        return f"+52{numero[-10:]}"
-    return f"+52{numero}" if len(numero) >= 7 else None
+
+    n = len(numero)
+    if n == 10:
+        return sys.intern("+52" + numero)
+    if n == 8:
+        return sys.intern("+5255" + numero)
+    if n > 10:
+        return sys.intern("+52" + numero[-10:])
+    return sys.intern("+52" + numero) if n >= 7 else None
 
 
 def deduplicar(leads: list[dict]) -> list[dict]:
-    por_tel   = {}
-    sin_tel   = []
+    """
+    Una sola pasada: la clave es el teléfono o, si no hay, el nombre normalizado
+    (de contacto o de empresa). Por clave se queda el lead más completo.
+    """
+    mejores: dict[str, tuple[int, dict]] = {}
     for lead in leads:
         tel = lead.get("telefono")
         if tel:
-            existente = por_tel.get(tel)
-            if not existente or _completitud(lead) > _completitud(existente):
-                por_tel[tel] = lead
+            clave = tel
         else:
-            sin_tel.append(lead)
-    nombres_vistos = set()
-    sin_tel_unicos = []
-    for lead in sin_tel:
-        clave = (lead.get("nombre_contacto") or lead.get("empresa") or "").lower().strip()
-        if clave and clave not in nombres_vistos:
-            nombres_vistos.add(clave)
-            sin_tel_unicos.append(lead)
-    return list(por_tel.values()) + sin_tel_unicos
+            nombre = _nombre_normalizado(lead) or _normalizar_nombre(lead.get("empresa"))
+            if not nombre:
+                continue
+            clave = "N:" + nombre
+        puntos = lead.get("_score")
+        if puntos is None:
+            puntos = lead["_score"] = _completitud(lead)
+        existente = mejores.get(clave)
+        if existente is None or puntos > existente[0]:
+            mejores[clave] = (puntos, lead)
+    return [lead for _, lead in mejores.values()]
 
 
 def _completitud(lead: dict) -> int:
-    campos = ["empresa", "telefono", "email", "nombre_contacto", "cargo",
-              "sitio_web", "colonia", "linkedin"]
-    return sum(1 for c in campos if lead.get(c))
+    """Campos llenos del lead; se guarda en `_score` al crearlo o enriquecerlo."""
+    return sum(1 for c in _CAMPOS_COMPLETITUD if lead.get(c))
 
 
-def guardar_resultados(leads: list[dict], output_path: str):
-    por_fuente = {}
+def _puntuar(lead: dict) -> dict:
+    lead["_score"] = _completitud(lead)
+    return lead
+
+
+def cargar_diario(path: str) -> list[dict]:
+    """Lee los leads anexados en el diario .jsonl (ignora una última línea truncada)."""
+    leads = []
+    try:
+        with Path(path).open(encoding="utf-8") as f:
+            for linea in f:
+                try:
+                    leads.append(_internar_categoricos(json.loads(linea)))
+                except json.JSONDecodeError:
+                    continue
+    except FileNotFoundError:
+        pass
+    return leads
+
+
+_CAMPOS_CATEGORICOS = ("nicho", "fuente", "delegacion")
+
+
+def _internar_categoricos(lead: dict) -> dict:
+    """
+    Interna los campos de valores repetidos. Los leads recién extraídos ya
+    comparten las constantes del módulo; los leídos de JSON traen una copia
+    nueva de cada cadena por lead.
+    """
+    for campo in _CAMPOS_CATEGORICOS:
+        valor = lead.get(campo)
+        if isinstance(valor, str):
+            lead[campo] = sys.intern(valor)
+    if isinstance(lead.get("nichos"), list):
+        lead["nichos"] = [sys.intern(n) for n in lead["nichos"]]
+    return lead
+
+
+def _estadisticas(leads: list[dict]) -> dict:
+    """
+    Conteos del resumen y de la metadata, en una sola pasada sobre los leads.
+    Los nichos/fuentes se juntan en listas y se cuentan con Counter (en C) al
+    final, en vez de actualizar dos Counter por lead desde Python.
+    """
+    con_tel = con_email = con_nombre = enriquec = 0
+    nichos, fuentes = [], []
+    agregar_nicho, agregar_fuente = nichos.append, fuentes.append
     for l in leads:
-        f = l.get("fuente", "?")
-        por_fuente[f] = por_fuente.get(f, 0) + 1
+        get = l.get
+        if get("telefono"):
+            con_tel += 1
+        if get("email"):
+            con_email += 1
+        if get("nombre_contacto"):
+            con_nombre += 1
+        if get("enriquecido_linkedin"):
+            enriquec += 1
+        agregar_nicho(get("nicho", "?"))
+        agregar_fuente(get("fuente", "?"))
+    por_nicho  = Counter(nichos)
+    por_fuente = Counter(fuentes)
+    return {
+        "total":      len(leads),
+        "con_tel":    con_tel,
+        "con_email":  con_email,
+        "con_nombre": con_nombre,
+        "enriquec":   enriquec,
+        "por_nicho":  por_nicho,
+        "por_fuente": por_fuente,
+    }
 
+
+def guardar_resultados(leads: list[dict], output_path: str):
+    stats = _estadisticas(leads)
     output = {
         "metadata": {
-            "total_leads":      len(leads),
+            "total_leads":      stats["total"],
             "fecha_ejecucion":  datetime.now().isoformat(),
             "version_script":   "1b.0.0",
-            "con_telefono":     sum(1 for l in leads if l.get("telefono")),
-            "con_email":        sum(1 for l in leads if l.get("email")),
-            "con_contacto":     sum(1 for l in leads if l.get("nombre_contacto")),
-            "por_fuente":       por_fuente,
-            "por_nicho": {
-                n: sum(1 for l in leads if l.get("nicho") == n)
-                for n in set(l.get("nicho", "?") for l in leads)
-            },
+            "con_telefono":     stats["con_tel"],
+            "con_email":        stats["con_email"],
+            "con_contacto":     stats["con_nombre"],
+            "por_fuente":       dict(stats["por_fuente"]),
+            "por_nicho":        dict(stats["por_nicho"]),
         },
-        "leads": leads,
+        # Sin los campos internos (`_norm_nombre`, …)
+        "leads": [
+            {k: v for k, v in l.items() if not k.startswith("_")} for l in leads
+        ],
     }
-    Path(output_path).write_text(
-        json.dumps(output, ensure_ascii=False, indent=2),
-        encoding="utf-8",
-    )
+    # Se escribe directo al archivo: sin armar antes todo el JSON como str
+    if orjson:
+        with open(output_path, "wb") as fp:
+            fp.write(orjson.dumps(output, option=orjson.OPT_INDENT_2))
+    else:
+        with open(output_path, "w", encoding="utf-8", buffering=1 << 20) as fp:
+            json.dump(output, fp, ensure_ascii=False, indent=2)
 
 
 def imprimir_resumen(leads: list[dict], output_path: str):
-    con_tel    = sum(1 for l in leads if l.get("telefono"))
-    con_email  = sum(1 for l in leads if l.get("email"))
-    con_nombre = sum(1 for l in leads if l.get("nombre_contacto"))
-    enriquec   = sum(1 for l in leads if l.get("enriquecido_linkedin"))
-
-    por_nicho  = {}
-    por_fuente = {}
-    for l in leads:
-        n = l.get("nicho", "?");   por_nicho[n]  = por_nicho.get(n, 0) + 1
-        f = l.get("fuente", "?");  por_fuente[f] = por_fuente.get(f, 0) + 1
+    stats      = _estadisticas(leads)
+    con_tel    = stats["con_tel"]
+    con_email  = stats["con_email"]
+    con_nombre = stats["con_nombre"]
+    enriquec   = stats["enriquec"]
+    por_nicho  = stats["por_nicho"]
+    por_fuente = stats["por_fuente"]
 
     print("\n" + "═" * 60)
     print("  📋  RESUMEN — extractor_hibrido.py")
@@ -924,11 +1487,11 @@ def imprimir_resumen(leads: list[dict], output_path: str):
     print(f"  🔗  Enriquecidos LinkedIn    : {enriquec}")
     print()
     print("  Por nicho:")
-    for nicho, cant in sorted(por_nicho.items(), key=lambda x: -x[1]):
+    for nicho, cant in por_nicho.most_common():
         print(f"    • {nicho:<30} {cant}")
     print()
     print("  Por fuente:")
-    for fuente, cant in sorted(por_fuente.items(), key=lambda x: -x[1]):
+    for fuente, cant in por_fuente.most_common():
         print(f"    • {fuente:<30} {cant}")
     print(f"\n  Archivo de salida           : {output_path}")
     print("═" * 60)
@@ -950,15 +1513,60 @@ def parse_args() -> argparse.Namespace:
                    help=f"Máx leads totales (default: {DEFAULT_MAX})")
     p.add_argument("--max-por-nicho",   type=int, default=60,
                    help="Máx leads por nicho en Doctoralia (default: 60)")
+    p.add_argument("--concurrencia",    type=int, default=ScraperDoctoralia.CONCURRENCIA,
+                   help=f"Perfiles de Doctoralia visitados en paralelo (default: {ScraperDoctoralia.CONCURRENCIA})")
     p.add_argument("--solo-doctoralia", action="store_true",
                    help="Omitir Phantombuster (solo Doctoralia)")
     p.add_argument("--mock",            action="store_true",
                    help="Modo prueba: sin scraping real")
+    p.add_argument("--reanudar",        action="store_true",
+                   help="Reanudar desde el diario .jsonl de una ejecución interrumpida")
+    p.add_argument("--sin-cache",       action="store_true",
+                   help=f"No leer ni escribir la caché de perfiles ({ScraperDoctoralia.RUTA_CACHE})")
     p.add_argument("--debug",           action="store_true",
                    help="Logging detallado + navegador visible")
     return p.parse_args()
 
 
+def _configurar_event_loop():
+    # ── Fix para Windows (Python 3.11+) ───────────────────────────────────────
+    # Playwright necesita ProactorEventLoop en Windows (es el default).
+    # NO usar WindowsSelectorEventLoopPolicy — eso rompe subprocess en Playwright.
+    if sys.platform == "win32":
+        asyncio.set_event_loop_policy(asyncio.WindowsProactorEventLoopPolicy())
+
+
+async def extraer_doctoralia(scraper: ScraperDoctoralia, max_total: int,
+                             max_por_nicho: int, previos: list[dict]) -> list[dict]:
+    """
+    Recorre los nichos de Doctoralia en paralelo con un único navegador compartido.
+    El pool de páginas y el semáforo del scraper son comunes a todos los nichos,
+    así que la concurrencia total hacia Doctoralia no crece con el número de nichos;
+    los perfiles repetidos entre nichos se visitan una sola vez.
+    `previos` son los leads recuperados del diario al reanudar: se conservan
+    y sus perfiles no se vuelven a visitar.
+    """
+    leads: list[dict] = list(previos)
+    omitir = {l["url_perfil"] for l in previos if l.get("url_perfil")}
+
+    pendientes = []
+    for nicho in NICHOS_DOCTORALIA:
+        ya_extraidos = sum(1 for l in previos if l.get("nicho") == nicho["nicho"])
+        if ya_extraidos >= max_por_nicho:
+            log.info(f"   ⏭️   {nicho['label']}: completo en el diario ({ya_extraidos}).")
+            continue
+        pendientes.append((nicho, max_por_nicho - ya_extraidos))
+
+    await scraper.iniciar()
+    try:
+        leads.extend(await scraper.extraer_todos(pendientes, omitir=omitir))
+    finally:
+        await scraper.cerrar()
+
+    log.info(f"   Acumulado: {len(leads)} leads.")
+    return leads[:max_total]
+
+
 def main():
     args = parse_args()
     if args.debug:
@@ -970,6 +1578,7 @@ def main():
     log.info(f"   Salida    : {args.output}")
 
     todos_los_leads: list[dict] = []
+    ruta_diario = str(Path(args.output).with_suffix(".jsonl"))
 
     # ── Modo Mock ────────────────────────────────────────────────────────────
     if args.mock:
@@ -977,19 +1586,29 @@ def main():
 
     else:
         # ── Fuente 1: Doctoralia ─────────────────────────────────────────────
-        scraper = ScraperDoctoralia(headless=not args.debug)
-        scraper.iniciar()
+        # Solo se comprueba que exista: playwright se importa en iniciar()
+        if importlib.util.find_spec("playwright") is None:
+            log.error("❌  playwright no instalado: pip install playwright && playwright install chromium")
+            sys.exit(1)
 
-        try:
-            max_por_nicho = min(args.max_por_nicho, args.max // len(NICHOS_DOCTORALIA))
-            for nicho in NICHOS_DOCTORALIA:
-                if len(todos_los_leads) >= args.max:
-                    break
-                leads_nicho = scraper.extraer_nicho(nicho, max_leads=max_por_nicho)
-                todos_los_leads.extend(leads_nicho)
-                log.info(f"   Acumulado: {len(todos_los_leads)} leads.")
-        finally:
-            scraper.cerrar()
+        previos = []
+        if args.reanudar:
+            previos = cargar_diario(ruta_diario)
+            log.info(f"   📂  Diario cargado: {len(previos)} leads ya extraídos.")
+        else:
+            Path(ruta_diario).unlink(missing_ok=True)
+
+        scraper = ScraperDoctoralia(
+            headless=not args.debug,
+            concurrencia=args.concurrencia,
+            ruta_diario=ruta_diario,
+            ruta_cache=None if args.sin_cache else ScraperDoctoralia.RUTA_CACHE,
+        )
+        max_por_nicho = min(args.max_por_nicho, args.max // len(NICHOS_DOCTORALIA))
+        _configurar_event_loop()
+        todos_los_leads = asyncio.run(
+            extraer_doctoralia(scraper, args.max, max_por_nicho, previos)
+        )
 
         # ── Fuente 2: Phantombuster (enriquecimiento) ────────────────────────
         if not args.solo_doctoralia:
@@ -1009,6 +1628,7 @@ def main():
 
     # ── Guardar ───────────────────────────────────────────────────────────────
     guardar_resultados(leads_unicos, args.output)
+    Path(ruta_diario).unlink(missing_ok=True)
     imprimir_resumen(leads_unicos, args.output)
 
 
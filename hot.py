@@ -0,0 +1,152 @@
+"""
+hot.py — Código por lead de verificar_whatsapp.py (rate limiting, fecha,
+ETA y marcado de resultados), con tipos para compilarlo con mypyc:
+
+    pip install mypy
+    python setup.py build_ext --inplace
+
+Si el módulo compilado (.so / .pyd) está junto a este archivo, Python lo
+carga en lugar de hot.py; si no, se usa este código tal cual.
+"""
+
+import asyncio
+import logging
+import time
+from datetime import datetime
+
+log = logging.getLogger("verificador")
+
+CAMPOS_VERIFICACION = ("whatsapp_valido", "whatsapp_estado", "fecha_verificacion")
+
+
+# ════════════════════════════════════════════════════════════════════════════
+# RATE LIMITING
+# ════════════════════════════════════════════════════════════════════════════
+
+class RateLimiter:
+    def __init__(self, max_por_hora: int):
+        self.max_por_hora   = max_por_hora
+        self.ventana_inicio = time.monotonic()
+        self.count_ventana  = 0
+        self._lock          = asyncio.Lock()
+
+    def _restante(self) -> float:
+        """Segundos que faltan para poder verificar otro número (0 = ya)."""
+        ahora   = time.monotonic()
+        elapsed = ahora - self.ventana_inicio
+        if elapsed >= 3600:
+            self.ventana_inicio = ahora
+            self.count_ventana  = 0
+            return 0.0
+        if self.count_ventana >= self.max_por_hora:
+            restante = 3600 - elapsed
+            log.warning(f"   ⏸️   Límite {self.max_por_hora}/hora alcanzado.")
+            log.warning(f"   ⏰  Esperando {restante/60:.1f} minutos...")
+            return restante + 5
+        return 0.0
+
+    def _nueva_ventana(self) -> None:
+        self.ventana_inicio = time.monotonic()
+        self.count_ventana  = 0
+
+    async def esperar(self) -> None:
+        """
+        Espera compartida por todas las pestañas: mientras una espera a que
+        se abra la ventana las demás se quedan en el lock, así que el límite
+        por hora es global. Llamar a registrar() justo después, sin await de
+        por medio, para que nadie más pase con el mismo cupo.
+        """
+        async with self._lock:
+            restante = self._restante()
+            if restante:
+                await asyncio.sleep(restante)
+                self._nueva_ventana()
+
+    def registrar(self) -> None:
+        self.count_ventana += 1
+
+    def progreso(self) -> str:
+        return f"{self.count_ventana}/{self.max_por_hora}"
+
+
+class CubetaTokens:
+    """
+    Token bucket para --mode http: se rellena a max_hora/3600 tokens por
+    segundo, así que el ritmo se reparte a lo largo de la hora en vez de
+    agotar el cupo y luego parar de golpe. Cada número consume un token.
+    """
+
+    def __init__(self, max_por_hora: int, capacidad: int):
+        self.max_por_hora = max_por_hora
+        self.tasa         = max_por_hora / 3600
+        self.capacidad    = capacidad
+        self._tokens      = float(capacidad)
+        self._ultimo      = time.monotonic()
+        self._lock        = asyncio.Lock()
+
+    def _rellenar(self) -> None:
+        ahora        = time.monotonic()
+        self._tokens = min(float(self.capacidad), self._tokens + (ahora - self._ultimo) * self.tasa)
+        self._ultimo = ahora
+
+    async def adquirir(self, n: int = 1) -> None:
+        async with self._lock:
+            self._rellenar()
+            if self._tokens < n:
+                espera = (n - self._tokens) / self.tasa
+                if espera > 60:
+                    log.info(f"   ⏸️   Cupo de {self.max_por_hora}/hora: esperando {espera/60:.1f} minutos...")
+                await asyncio.sleep(espera)
+                self._rellenar()
+            self._tokens -= n
+
+    def progreso(self) -> str:
+        return f"{int(self._tokens)}/{self.capacidad} tokens"
+
+
+# ════════════════════════════════════════════════════════════════════════════
+# FECHA, ETA Y MARCADO DE LEADS
+# ════════════════════════════════════════════════════════════════════════════
+
+# Fecha de hoy en ISO, recalculada solo al pasar la medianoche
+_hoy_fecha = ""
+_hoy_vence = 0.0
+
+
+def hoy_iso() -> str:
+    global _hoy_fecha, _hoy_vence
+    ahora = time.monotonic()
+    if ahora >= _hoy_vence:
+        momento    = datetime.now()
+        medianoche = momento.replace(hour=0, minute=0, second=0, microsecond=0)
+        _hoy_fecha = momento.strftime("%Y-%m-%d")
+        _hoy_vence = ahora + 86400 - (momento - medianoche).total_seconds()
+    return _hoy_fecha
+
+
+def calcular_eta(inicio: float, completados: int, total: int) -> str:
+    """ETA a partir de {inicio}, un instante de time.monotonic()."""
+    if completados == 0:
+        return "--:--"
+    elapsed   = time.monotonic() - inicio
+    por_lead  = elapsed / completados
+    segundos  = int(por_lead * (total - completados))
+    if segundos < 60:
+        return f"{segundos}s"
+    elif segundos < 3600:
+        return f"{segundos // 60}m {segundos % 60}s"
+    else:
+        return f"{segundos // 3600}h {(segundos % 3600) // 60}m"
+
+
+def marcar_lead(lead: dict, resultado: bool) -> dict:
+    """Anota el resultado en {lead} y devuelve solo los campos de verificación."""
+    fecha = hoy_iso()
+    lead["whatsapp_valido"]    = resultado
+    lead["whatsapp_estado"]    = "valido" if resultado else "invalido"
+    lead["fecha_verificacion"] = fecha
+    return {
+        "whatsapp_valido":    resultado,
+        "whatsapp_estado":    lead["whatsapp_estado"],
+        "fecha_verificacion": fecha,
+    }
@@ -0,0 +1,22 @@
+"""
+Compila hot.py con mypyc (opcional; verificar_whatsapp.py funciona sin esto):
+
+    pip install mypy
+    python setup.py build_ext --inplace
+
+Deja hot.*.so / hot.*.pyd junto a hot.py; para volver al código Python
+basta con borrar esos archivos. Sin mypy no se compila nada.
+"""
+
+from setuptools import setup
+
+try:
+    from mypyc.build import mypycify
+except ImportError:
+    mypycify = None
+    print("⚠️  mypy no instalado: hot.py no se compila (pip install mypy)")
+
+setup(
+    name="leads-b2b-hot",
+    ext_modules=mypycify(["hot.py"]) if mypycify else [],
+)
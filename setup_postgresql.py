@@ -30,17 +30,27 @@
 ║    DB_PASSWORD → tu_password                                            ║
 ╚══════════════════════════════════════════════════════════════════════════╝
 
+fecha_actualizacion no la mantiene un trigger: cada UPDATE sobre `leads`
+(upsert de importar, limpiar o consultas manuales) debe incluir
+`fecha_actualizacion = NOW()`.
+
 Dependencias:
     pip install psycopg2-binary python-dotenv
+    pip install ijson   (opcional: lectura incremental de JSON grandes)
+    pip install orjson  (opcional: carga más rápida de JSON)
 """
 
 import argparse
+import atexit
 import csv
+import itertools
 import json
 import logging
 import os
+import struct
 import sys
-from datetime import datetime
+from datetime import date, datetime
+from functools import lru_cache
 from pathlib import Path
 
 try:
@@ -49,6 +59,18 @@ try:
 except ImportError:
     pass
 
+# Parser JSON incremental (opcional; sin él se carga el archivo completo)
+try:
+    import ijson
+except ImportError:
+    ijson = None
+
+# Parser JSON en C para la carga completa (opcional; sin él se usa json)
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
 logging.basicConfig(
     level=logging.INFO,
     format="%(asctime)s  %(levelname)-8s  %(message)s",
@@ -73,6 +95,33 @@ COLUMNAS_CSV = [
 ]
 
 
+def iter_leads(path: Path):
+    """
+    Genera los leads de un JSON de resultados, ya sea `{"leads": [...]}` o una
+    lista. Con ijson se leen de forma incremental sin cargar todo el archivo.
+    """
+    if ijson is None:
+        if orjson is not None:
+            raw = orjson.loads(path.read_bytes())
+        else:
+            raw = json.loads(path.read_text(encoding="utf-8"))
+        yield from (raw.get("leads") or []) if isinstance(raw, dict) else raw
+        return
+
+    with path.open("rb") as f:
+        # El primer carácter significativo dice si es lista u objeto
+        inicio = f.read(64).lstrip(b"\xef\xbb\xbf \t\r\n")[:1]
+        f.seek(0)
+        prefijo = "item" if inicio == b"[" else "leads.item"
+        yield from ijson.items(f, prefijo, use_float=True)
+
+
+# Expresiones SQL para columnas del CSV que no basta con convertir a texto
+_EXPR_CSV = {
+    "whatsapp_valido": "CASE WHEN whatsapp_valido THEN 'True' WHEN NOT whatsapp_valido THEN 'False' END",
+}
+
+
 def get_db_config() -> dict:
     return {
         "host":     os.getenv("DB_HOST",     "localhost"),
@@ -83,18 +132,27 @@ def get_db_config() -> dict:
     }
 
 
+# Pool de conexiones del proceso (se crea con la primera llamada a conectar)
+_POOL = None
+
+
 def conectar():
-    """Abre y devuelve una conexión a PostgreSQL."""
+    """Toma una conexión del pool (abriéndolo la primera vez). Devolver con liberar()."""
+    global _POOL
     try:
         import psycopg2
         import psycopg2.extras
+        import psycopg2.pool
     except ImportError:
         log.error("❌  psycopg2 no instalado: pip install psycopg2-binary")
         sys.exit(1)
 
     cfg = get_db_config()
     try:
-        conn = psycopg2.connect(**cfg)
+        if _POOL is None:
+            _POOL = psycopg2.pool.SimpleConnectionPool(1, 4, **cfg)
+            atexit.register(_POOL.closeall)
+        conn = _POOL.getconn()
         conn.autocommit = False
         return conn
     except Exception as exc:
@@ -104,6 +162,14 @@ def conectar():
         sys.exit(1)
 
 
+def liberar(conn):
+    """Devuelve una conexión al pool con la sesión en su estado por defecto."""
+    if not conn.closed:
+        conn.rollback()
+        conn.set_session(isolation_level="DEFAULT", readonly="DEFAULT", autocommit=False)
+    _POOL.putconn(conn)
+
+
 def parse_args() -> argparse.Namespace:
     p = argparse.ArgumentParser(
         description="Gestión de base de datos PostgreSQL para leads B2B",
@@ -115,13 +181,21 @@ def parse_args() -> argparse.Namespace:
     sub.add_parser("setup", help="Crear tablas, índices y vistas (idempotente)")
 
     # importar
-    imp = sub.add_parser("importar", help="Insertar leads desde JSON verificado")
+    imp = sub.add_parser(
+        "importar", help="Insertar leads desde JSON verificado",
+        description="Inserta leads desde JSON verificado (upsert por teléfono). "
+                    "La transacción usa synchronous_commit=off: si el servidor de "
+                    "PostgreSQL se cae justo después, pueden perderse los últimos "
+                    "cambios confirmados; basta con volver a importar el archivo.",
+    )
     imp.add_argument("--input",  default=DEFAULT_INPUT,
                      help=f"Archivo JSON de entrada (default: {DEFAULT_INPUT})")
     imp.add_argument("--nicho",  default="salud_mental",
                      help="Identificador del nicho (default: salud_mental)")
     imp.add_argument("--expo",   default=None,
                      help="ID de la expo/campaña (opcional)")
+    imp.add_argument("--staging", action="store_true",
+                     help="Cargar con COPY a una tabla temporal y fusionar (automático si la tabla está vacía)")
 
     # exportar (desde BD)
     exp = sub.add_parser("exportar", help="Exportar leads a CSV para CRM desde PostgreSQL")
@@ -151,7 +225,12 @@ def parse_args() -> argparse.Namespace:
     sub.add_parser("stats", help="Ver estadísticas de la base de datos")
 
     # limpiar
-    sub.add_parser("limpiar", help="Eliminar duplicados y registros inválidos")
+    sub.add_parser(
+        "limpiar", help="Eliminar duplicados y registros inválidos",
+        description="Elimina registros vacíos y normaliza empresa/email/estado. "
+                    "Usa synchronous_commit=off (los cambios son regenerables: si "
+                    "se pierden por una caída del servidor, basta con repetirlo).",
+    )
 
     p.add_argument("--debug", action="store_true", help="Logging detallado")
     return p.parse_args()
@@ -229,21 +308,27 @@ CREATE INDEX IF NOT EXISTS idx_leads_crm_estado
 CREATE INDEX IF NOT EXISTS idx_leads_empresa_trgm
     ON leads USING GIN (empresa gin_trgm_ops);
 
+-- Lista pendiente GIN más grande: las inserciones se acumulan y se integran
+-- al índice por bloques (importar además lo recrea en cargas grandes)
+ALTER INDEX IF EXISTS idx_leads_empresa_trgm
+    SET (fastupdate = on, gin_pending_list_limit = 16384);
+
+-- Parciales sobre WhatsApp válidos: delegaciones con empresa (index-only scan)
+-- y el orden de v_leads_crm / exportar (evita el nodo Sort)
+CREATE INDEX IF NOT EXISTS idx_leads_del_wa
+    ON leads (delegacion) INCLUDE (empresa)
+    WHERE whatsapp_valido = TRUE;
+
+CREATE INDEX IF NOT EXISTS idx_leads_export_order
+    ON leads (nicho, delegacion, empresa, id)
+    WHERE whatsapp_valido = TRUE;
+
 -- ─────────────────────────────────────────────────────────────────────────
--- Trigger: actualizar fecha_actualizacion automáticamente
+-- Sin trigger de fecha_actualizacion: cada UPDATE la fija explícitamente.
+-- Se elimina el de versiones anteriores (una llamada PL/pgSQL por fila).
 -- ─────────────────────────────────────────────────────────────────────────
-CREATE OR REPLACE FUNCTION actualizar_timestamp()
-RETURNS TRIGGER AS $$
-BEGIN
-    NEW.fecha_actualizacion = NOW();
-    RETURN NEW;
-END;
-$$ LANGUAGE plpgsql;
-
 DROP TRIGGER IF EXISTS trg_leads_timestamp ON leads;
-CREATE TRIGGER trg_leads_timestamp
-    BEFORE UPDATE ON leads
-    FOR EACH ROW EXECUTE FUNCTION actualizar_timestamp();
+DROP FUNCTION IF EXISTS actualizar_timestamp();
 
 -- ─────────────────────────────────────────────────────────────────────────
 -- Vista: leads listos para CRM (WhatsApp válido + datos mínimos)
@@ -315,28 +400,398 @@ def cmd_setup():
     try:
         cur.execute(SQL_SETUP)
         conn.commit()
-        log.info("   ✅  Tablas, índices, vistas y triggers creados (o ya existían).")
+        log.info("   ✅  Tablas, índices y vistas creados (o ya existían).")
         log.info("   Objetos creados:")
         log.info("     • Tabla   : leads")
         log.info("     • Tabla   : ejecuciones")
         log.info("     • Vista   : v_leads_crm")
         log.info("     • Vista   : v_stats")
-        log.info("     • Trigger : trg_leads_timestamp")
-        log.info("     • Índices : 6 índices de consulta")
+        log.info(f"     • Índices : {SQL_SETUP.count('CREATE INDEX')} índices de consulta")
     except Exception as exc:
         conn.rollback()
         log.error(f"❌  Error en setup: {exc}")
         sys.exit(1)
     finally:
         cur.close()
-        conn.close()
+        liberar(conn)
 
 
 # ════════════════════════════════════════════════════════════════════════════
 # 2. IMPORTAR — Insertar leads desde JSON verificado
 # ════════════════════════════════════════════════════════════════════════════
 
-def cmd_importar(input_path: str, nicho: str, expo_id: str | None):
+TAMANO_LOTE = 1000   # filas por EXECUTE del upsert preparado
+TAMANO_TANDA = 1000  # leads que se leen del archivo de una vez
+
+# A partir de cuántas filas conviene quitar el índice GIN trigram durante la
+# carga y reconstruirlo al final, en vez de mantenerlo fila por fila
+UMBRAL_RECREAR_TRGM = 5000
+SQL_RECREAR_TRGM = """
+    CREATE INDEX CONCURRENTLY IF NOT EXISTS idx_leads_empresa_trgm
+        ON leads USING GIN (empresa gin_trgm_ops)
+        WITH (fastupdate = on, gin_pending_list_limit = 16384)
+"""
+
+# Columnas del INSERT, en el orden de las tuplas que arma _fila_lead
+COLUMNAS_INSERT = (
+    "nicho", "expo_id", "empresa", "sitio_web", "colonia", "delegacion",
+    "telefono", "email", "nombre_contacto", "cargo", "linkedin",
+    "whatsapp_valido", "whatsapp_estado", "fecha_verificacion",
+    "fuente", "fecha_extraccion",
+)
+# Tipo SQL de cada columna para los arreglos del upsert preparado (resto: text)
+_TIPOS_INSERT = {
+    "whatsapp_valido":    "boolean",
+    "fecha_verificacion": "date",
+    "fecha_extraccion":   "date",
+}
+_IDX_EMPRESA  = COLUMNAS_INSERT.index("empresa")
+_IDX_TELEFONO = COLUMNAS_INSERT.index("telefono")
+# Columnas que el upsert solo completa si están vacías / que siempre reemplaza
+_IDX_COMPLETAR = tuple(COLUMNAS_INSERT.index(c) for c in (
+    "empresa", "email", "nombre_contacto", "cargo",
+    "sitio_web", "linkedin", "colonia", "delegacion",
+))
+_IDX_VERIFICACION = tuple(COLUMNAS_INSERT.index(c) for c in (
+    "whatsapp_valido", "whatsapp_estado", "fecha_verificacion",
+))
+
+# Si el teléfono ya existe, actualizar los campos vacíos.
+# El WHERE descarta los UPDATE que no cambiarían nada: así no se escribe una
+# versión nueva de la fila ni se toca fecha_actualizacion (esas filas no
+# aparecen en RETURNING y se cuentan como "sin cambios").
+_SQL_ON_CONFLICT = """
+    ON CONFLICT (telefono) DO UPDATE SET (
+        empresa, email, nombre_contacto, cargo, sitio_web, linkedin, colonia, delegacion,
+        whatsapp_valido, whatsapp_estado, fecha_verificacion,
+        fecha_actualizacion
+    ) = (
+        -- Solo actualizar si el campo existente está vacío (no sobreescribir datos buenos)
+        COALESCE(NULLIF(leads.empresa, ''), EXCLUDED.empresa),
+        COALESCE(leads.email,               EXCLUDED.email),
+        COALESCE(leads.nombre_contacto,     EXCLUDED.nombre_contacto),
+        COALESCE(leads.cargo,               EXCLUDED.cargo),
+        COALESCE(leads.sitio_web,           EXCLUDED.sitio_web),
+        COALESCE(leads.linkedin,            EXCLUDED.linkedin),
+        COALESCE(leads.colonia,             EXCLUDED.colonia),
+        COALESCE(leads.delegacion,          EXCLUDED.delegacion),
+        -- Siempre actualizar verificación (puede haberse re-verificado)
+        EXCLUDED.whatsapp_valido,
+        EXCLUDED.whatsapp_estado,
+        EXCLUDED.fecha_verificacion,
+        NOW()
+    )
+    WHERE (
+        COALESCE(NULLIF(leads.empresa, ''), EXCLUDED.empresa),
+        COALESCE(leads.email,               EXCLUDED.email),
+        COALESCE(leads.nombre_contacto,     EXCLUDED.nombre_contacto),
+        COALESCE(leads.cargo,               EXCLUDED.cargo),
+        COALESCE(leads.sitio_web,           EXCLUDED.sitio_web),
+        COALESCE(leads.linkedin,            EXCLUDED.linkedin),
+        COALESCE(leads.colonia,             EXCLUDED.colonia),
+        COALESCE(leads.delegacion,          EXCLUDED.delegacion),
+        EXCLUDED.whatsapp_valido,
+        EXCLUDED.whatsapp_estado,
+        EXCLUDED.fecha_verificacion
+    ) IS DISTINCT FROM (
+        leads.empresa, leads.email, leads.nombre_contacto, leads.cargo,
+        leads.sitio_web, leads.linkedin, leads.colonia, leads.delegacion,
+        leads.whatsapp_valido, leads.whatsapp_estado, leads.fecha_verificacion
+    )
+    RETURNING (xmax = 0) AS es_insercion  -- TRUE=insert, FALSE=update
+"""
+
+# Upsert por lotes como sentencia preparada: se analiza y planifica una sola
+# vez por importación; cada lote viaja como un arreglo por columna (UNNEST).
+_ARREGLOS_INSERT = [f"{_TIPOS_INSERT.get(col, 'text')}[]" for col in COLUMNAS_INSERT]
+SQL_UPSERT_PREPARAR = f"""
+    PREPARE leads_upsert ({", ".join(_ARREGLOS_INSERT)}) AS
+    INSERT INTO leads ({", ".join(COLUMNAS_INSERT)})
+    SELECT * FROM UNNEST({", ".join(f"${i}" for i in range(1, len(COLUMNAS_INSERT) + 1))})
+""" + _SQL_ON_CONFLICT
+SQL_UPSERT_EJECUTAR = (
+    "EXECUTE leads_upsert (" + ", ".join(f"%s::{tipo}" for tipo in _ARREGLOS_INSERT) + ")"
+)
+
+# Carga masiva: COPY a una tabla temporal y fusión con el mismo ON CONFLICT.
+# `orden` conserva la posición en el archivo para insertar en el mismo orden.
+SQL_STAGING_CREAR = f"""
+    CREATE TEMP TABLE leads_staging ON COMMIT DROP AS
+    SELECT {", ".join(COLUMNAS_INSERT)}, 0 AS orden FROM leads WITH NO DATA
+"""
+SQL_STAGING_COPY = (
+    f"COPY leads_staging ({', '.join(COLUMNAS_INSERT)}, orden) FROM STDIN WITH (FORMAT BINARY)"
+)
+
+# Formato binario de COPY: firma + flags + extensión de cabecera, y -1 al final
+_I32               = struct.Struct("!i").pack
+_COPY_BIN_CABECERA = b"PGCOPY\n\xff\r\n\0" + struct.pack("!ii", 0, 0)
+_COPY_BIN_FIN      = struct.pack("!h", -1)
+_COPY_BIN_NULL     = _I32(-1)
+_COPY_BIN_BOOL     = {True: _I32(1) + b"\x01", False: _I32(1) + b"\x00"}
+_EPOCH_PG          = date(2000, 1, 1).toordinal()   # fechas: días desde 2000-01-01
+SQL_STAGING_FUSIONAR = f"""
+    INSERT INTO leads ({", ".join(COLUMNAS_INSERT)})
+    SELECT {", ".join(COLUMNAS_INSERT)}
+    FROM leads_staging
+    ORDER BY orden
+""" + _SQL_ON_CONFLICT
+
+
+def _fila_lead(lead: dict, nicho: str, expo_id: str | None) -> tuple:
+    """Tupla de valores de un lead en el orden de COLUMNAS_INSERT."""
+    g = lead.get
+    return (
+        nicho,
+        expo_id,
+        (g("empresa") or "").strip() or None,
+        g("sitio_web"),
+        g("colonia"),
+        g("delegacion"),
+        g("telefono"),
+        (g("email") or "").strip() or None,
+        g("nombre_contacto"),
+        g("cargo"),
+        g("linkedin"),
+        g("whatsapp_valido"),
+        g("whatsapp_estado", "pendiente"),
+        g("fecha_verificacion"),
+        g("fuente", "Desconocida"),
+        g("fecha_extraccion"),
+    )
+
+
+def _fusionar_repetidos(filas) -> tuple[list[tuple], int]:
+    """
+    Junta en una sola fila los leads con el mismo teléfono, aplicando las
+    mismas reglas que el ON CONFLICT (completar campos vacíos, la última
+    verificación gana). El resultado en la BD es el mismo que upsertearlos
+    uno por uno, pero cada teléfono se escribe una sola vez.
+    Devuelve (filas, cantidad de leads fusionados).
+    """
+    unicas: list[tuple] = []
+    posicion: dict[str, int] = {}
+    fusionados = 0
+    for fila in filas:
+        tel = fila[_IDX_TELEFONO]
+        if tel is None:
+            unicas.append(fila)
+            continue
+        i = posicion.get(tel)
+        if i is None:
+            posicion[tel] = len(unicas)
+            unicas.append(fila)
+            continue
+        previa = list(unicas[i])
+        for c in _IDX_COMPLETAR:
+            if previa[c] is None:
+                previa[c] = fila[c]
+        for c in _IDX_VERIFICACION:
+            previa[c] = fila[c]
+        unicas[i] = tuple(previa)
+        fusionados += 1
+    return unicas, fusionados
+
+
+def _lotes(filas, tamano: int):
+    """Parte las filas (lista o iterador, sin leerlo entero) en lotes de hasta `tamano`."""
+    filas = iter(filas)
+    while lote := list(itertools.islice(filas, tamano)):
+        yield lote
+
+
+def _tabla_vacia(conn) -> bool:
+    with conn.cursor() as cur:
+        cur.execute("SELECT 1 FROM leads LIMIT 1")
+        return cur.fetchone() is None
+
+
+def _quitar_indice_trgm(conn) -> bool:
+    """Elimina idx_leads_empresa_trgm antes de una carga grande. True si existía."""
+    with conn.cursor() as cur:
+        cur.execute("SELECT to_regclass('idx_leads_empresa_trgm') IS NOT NULL")
+        (existe,) = cur.fetchone()
+        if existe:
+            cur.execute("DROP INDEX idx_leads_empresa_trgm")
+    conn.commit()
+    if existe:
+        log.info("   🗂️   Índice trigram de empresa retirado durante la carga.")
+    return existe
+
+
+def _recrear_indice_trgm(conn):
+    """Reconstruye idx_leads_empresa_trgm sin bloquear escrituras (CONCURRENTLY)."""
+    inicio = datetime.now()
+    conn.rollback()
+    conn.autocommit = True   # CREATE INDEX CONCURRENTLY no admite transacción
+    try:
+        with conn.cursor() as cur:
+            cur.execute(SQL_RECREAR_TRGM)
+        log.info(f"   🗂️   Índice trigram de empresa recreado ({(datetime.now() - inicio).total_seconds():.1f}s)")
+    except Exception as exc:
+        log.warning(f"   ⚠️  No se pudo recrear idx_leads_empresa_trgm ({exc}). Ejecuta `setup` para crearlo.")
+    finally:
+        conn.autocommit = False
+
+
+def _importar_lotes(conn, filas: list[tuple]) -> tuple[int, int, int]:
+    """
+    Upsert con la sentencia preparada leads_upsert (la prepara cmd_importar
+    una vez por importación). Cada lote va dentro de un SAVEPOINT: si falla,
+    solo se deshace ese lote y se reintenta fila por fila para aislar las
+    filas inválidas. No hace commit; devuelve (insertados, actualizados, errores).
+    """
+    def upsert(lote: list[tuple]) -> tuple[int, int]:
+        cur.execute("SAVEPOINT lote")
+        try:
+            # Filas → un arreglo por columna
+            cur.execute(SQL_UPSERT_EJECUTAR, [list(col) for col in zip(*lote)])
+            resultado = cur.fetchall()
+        except Exception:
+            cur.execute("ROLLBACK TO SAVEPOINT lote")
+            raise
+        cur.execute("RELEASE SAVEPOINT lote")
+        nuevos = sum(1 for (es_insercion,) in resultado if es_insercion)
+        return nuevos, len(resultado) - nuevos
+
+    insertados   = 0
+    actualizados = 0
+    errores      = 0
+    with conn.cursor() as cur:
+        for lote in _lotes(filas, TAMANO_LOTE):
+            try:
+                nuevos, existentes = upsert(lote)
+            except Exception as exc:
+                log.debug(f"   Error en lote de {len(lote)} leads: {exc}. Reintentando uno por uno…")
+                nuevos = existentes = 0
+                for fila in lote:
+                    try:
+                        n, e = upsert([fila])
+                    except Exception as exc_fila:
+                        log.debug(f"   Error en lead {fila[_IDX_EMPRESA] or fila[_IDX_TELEFONO]}: {exc_fila}")
+                        errores += 1
+                        continue
+                    nuevos     += n
+                    existentes += e
+            insertados   += nuevos
+            actualizados += existentes
+
+    return insertados, actualizados, errores
+
+
+def _liberar_upsert(conn):
+    """
+    DEALLOCATE de leads_upsert: la sentencia preparada vive en la sesión (no
+    en la transacción) y la conexión vuelve al pool, así que se libera siempre.
+    """
+    from psycopg2.extensions import TRANSACTION_STATUS_INERROR
+
+    if conn.info.transaction_status == TRANSACTION_STATUS_INERROR:
+        conn.rollback()
+    with conn.cursor() as cur:
+        cur.execute("DEALLOCATE leads_upsert")
+
+
+# Codificadores de campo (longitud + datos) para COPY binario, por tipo SQL
+def _bin_texto(valor) -> bytes:
+    dato = str(valor).encode("utf-8")
+    return _I32(len(dato)) + dato
+
+
+def _bin_booleano(valor) -> bytes:
+    if not isinstance(valor, bool):
+        raise TypeError(f"booleano inválido: {valor!r}")
+    return _COPY_BIN_BOOL[valor]
+
+
+@lru_cache(maxsize=4096)
+def _bin_fecha(valor: str) -> bytes:
+    return _I32(4) + _I32(date.fromisoformat(valor).toordinal() - _EPOCH_PG)
+
+
+_COPY_BIN_CAMPOS = {"text": _bin_texto, "boolean": _bin_booleano, "date": _bin_fecha}
+
+
+def _copy_binario(filas):
+    """
+    Codifica las filas (más la columna `orden`) en el formato binario de COPY:
+    el servidor no tiene que volver a interpretar booleanos ni fechas desde
+    texto. Genera los bytes fila por fila conforme se consume {filas}. Un valor
+    que no se pueda codificar lanza excepción (y la carga cae al upsert por
+    lotes, que aísla la fila).
+    """
+    codificadores = [_COPY_BIN_CAMPOS[_TIPOS_INSERT.get(col, "text")] for col in COLUMNAS_INSERT]
+    n_cols  = struct.pack("!h", len(COLUMNAS_INSERT) + 1)
+    orden_4 = _I32(4)
+    yield _COPY_BIN_CABECERA
+    for orden, fila in enumerate(filas):
+        yield n_cols + b"".join([
+            _COPY_BIN_NULL if valor is None else codificar(valor)
+            for codificar, valor in zip(codificadores, fila)
+        ]) + orden_4 + _I32(orden)
+    yield _COPY_BIN_FIN
+
+
+class _LectorCopy:
+    """
+    Archivo de solo lectura sobre un generador de bytes, para copy_expert.
+    psycopg2 convierte cualquier excepción de read() en un error del COPY;
+    `interrumpido` recuerda si fue un Ctrl+C.
+    """
+
+    def __init__(self, partes):
+        self._partes      = partes
+        self._resto       = b""
+        self.interrumpido = False
+
+    def read(self, n: int = -1) -> bytes:
+        trozos = [self._resto]
+        tam    = len(self._resto)
+        try:
+            for parte in self._partes:
+                trozos.append(parte)
+                tam += len(parte)
+                if 0 <= n <= tam:
+                    break
+        except KeyboardInterrupt:
+            self.interrumpido = True
+            raise
+        datos = b"".join(trozos)
+        if n < 0:
+            self._resto = b""
+            return datos
+        self._resto = datos[n:]
+        return datos[:n]
+
+
+def _importar_staging(conn, filas) -> tuple[int, int]:
+    """
+    Carga masiva: un solo COPY FROM STDIN a una tabla temporal, alimentado
+    conforme se consume {filas} (sin juntarlas en memoria), y una sola fusión
+    en `leads` al final (las filas no deben repetir teléfono).
+    Va dentro de un SAVEPOINT: si falla, la transacción sigue utilizable.
+    No hace commit; devuelve (insertados, actualizados). Las filas sin cambios
+    no cuentan en ninguno de los dos.
+    """
+    lector = _LectorCopy(_copy_binario(filas))
+    with conn.cursor() as cur:
+        cur.execute("SAVEPOINT staging")
+        try:
+            cur.execute(SQL_STAGING_CREAR)
+            cur.copy_expert(SQL_STAGING_COPY, lector, size=1 << 16)
+            cur.execute(SQL_STAGING_FUSIONAR)
+            resultado = cur.fetchall()
+        except Exception:
+            cur.execute("ROLLBACK TO SAVEPOINT staging")
+            if lector.interrumpido:
+                raise KeyboardInterrupt from None
+            raise
+        cur.execute("RELEASE SAVEPOINT staging")
+    insertados = sum(1 for (es_insercion,) in resultado if es_insercion)
+    return insertados, len(resultado) - insertados
+
+
+def cmd_importar(input_path: str, nicho: str, expo_id: str | None, staging: bool = False):
     log.info(f"📥  Importando leads desde: {input_path}")
     log.info(f"   Nicho   : {nicho}")
     log.info(f"   Expo ID : {expo_id or '(ninguno)'}")
@@ -347,97 +802,112 @@ def cmd_importar(input_path: str, nicho: str, expo_id: str | None):
         log.error(f"❌  Archivo no encontrado: {input_path}")
         sys.exit(1)
 
-    raw = json.loads(path.read_text(encoding="utf-8"))
-    leads = raw["leads"] if isinstance(raw, dict) and "leads" in raw else raw
-
-    if not leads:
+    leads = iter_leads(path)
+    primero = next(leads, None)
+    if primero is None:
         log.warning("⚠️  El archivo no contiene leads.")
         return
 
-    log.info(f"   {len(leads)} leads en el archivo.")
-
     conn = conectar()
-    import psycopg2.extras
-
-    cur          = conn.cursor()
+    total        = 0
+    escritas     = 0
     insertados   = 0
     actualizados = 0
     omitidos     = 0
     errores      = 0
+    fusionados   = 0
     inicio       = datetime.now()
 
-    # SQL de upsert: si el teléfono ya existe, actualizar los campos vacíos
-    SQL_UPSERT = """
-        INSERT INTO leads (
-            nicho, expo_id, empresa, sitio_web, colonia, delegacion,
-            telefono, email, nombre_contacto, cargo, linkedin,
-            whatsapp_valido, whatsapp_estado, fecha_verificacion,
-            fuente, fecha_extraccion
-        ) VALUES (
-            %(nicho)s, %(expo_id)s, %(empresa)s, %(sitio_web)s,
-            %(colonia)s, %(delegacion)s, %(telefono)s, %(email)s,
-            %(nombre_contacto)s, %(cargo)s, %(linkedin)s,
-            %(whatsapp_valido)s, %(whatsapp_estado)s, %(fecha_verificacion)s,
-            %(fuente)s, %(fecha_extraccion)s
-        )
-        ON CONFLICT (telefono) DO UPDATE SET
-            -- Solo actualizar si el campo existente está vacío (no sobreescribir datos buenos)
-            empresa             = COALESCE(NULLIF(leads.empresa, ''),           EXCLUDED.empresa),
-            email               = COALESCE(leads.email,                         EXCLUDED.email),
-            nombre_contacto     = COALESCE(leads.nombre_contacto,               EXCLUDED.nombre_contacto),
-            cargo               = COALESCE(leads.cargo,                         EXCLUDED.cargo),
-            sitio_web           = COALESCE(leads.sitio_web,                     EXCLUDED.sitio_web),
-            linkedin            = COALESCE(leads.linkedin,                      EXCLUDED.linkedin),
-            colonia             = COALESCE(leads.colonia,                       EXCLUDED.colonia),
-            delegacion          = COALESCE(leads.delegacion,                    EXCLUDED.delegacion),
-            -- Siempre actualizar verificación (puede haberse re-verificado)
-            whatsapp_valido     = EXCLUDED.whatsapp_valido,
-            whatsapp_estado     = EXCLUDED.whatsapp_estado,
-            fecha_verificacion  = EXCLUDED.fecha_verificacion,
-            fecha_actualizacion = NOW()
-        RETURNING (xmax = 0) AS es_insercion  -- TRUE=insert, FALSE=update
-    """
-
+    def filas_por_tanda(tandas):
+        """Filas de cada tanda, sin leads vacíos ni teléfonos repetidos en la tanda."""
+        nonlocal total, omitidos, fusionados
+        for tanda in tandas:
+            filas = []
+            for lead in tanda:
+                total += 1
+                # Omitir leads completamente vacíos
+                if not lead.get("empresa") and not lead.get("telefono"):
+                    omitidos += 1
+                    continue
+                filas.append(_fila_lead(lead, nicho, expo_id))
+            filas, n = _fusionar_repetidos(filas)
+            fusionados += n
+            yield filas
+
+    def filas_staging(tandas, tardias: list[tuple]):
+        """
+        Todas las filas, para un solo COPY. Un teléfono que ya se envió en una
+        tanda anterior no puede ir dos veces a la tabla temporal: esas filas
+        se apartan en {tardias} y se aplican después de la fusión.
+        """
+        nonlocal escritas
+        vistos: set[str] = set()
+        for filas in filas_por_tanda(tandas):
+            for fila in filas:
+                tel = fila[_IDX_TELEFONO]
+                if tel is not None:
+                    if tel in vistos:
+                        tardias.append(fila)
+                        continue
+                    vistos.add(tel)
+                escritas += 1
+                yield fila
+
+    # El archivo se lee y se carga por tandas: en memoria solo hay una a la vez
+    tandas = _lotes(itertools.chain((primero,), leads), TAMANO_TANDA)
+
+    # Carga grande: mantener el GIN fila por fila cuesta más que reconstruirlo.
+    # Para decidirlo se leen por adelantado tandas hasta pasar el umbral.
+    adelantadas = []
+    leidos      = 0
+    for tanda in tandas:
+        adelantadas.append(tanda)
+        leidos += len(tanda)
+        if leidos > UMBRAL_RECREAR_TRGM:
+            break
+    tandas = itertools.chain(adelantadas, tandas)
+
+    # Desde que se retira el índice, cualquier salida (error, Ctrl+C) lo recrea
+    recrear_trgm = False
+    preparada    = False
     try:
-        for lead in leads:
-            # Omitir leads completamente vacíos
-            if not lead.get("empresa") and not lead.get("telefono"):
-                omitidos += 1
-                continue
-
-            params = {
-                "nicho":              nicho,
-                "expo_id":            expo_id,
-                "empresa":            (lead.get("empresa") or "").strip() or None,
-                "sitio_web":          lead.get("sitio_web"),
-                "colonia":            lead.get("colonia"),
-                "delegacion":         lead.get("delegacion"),
-                "telefono":           lead.get("telefono"),
-                "email":              (lead.get("email") or "").strip() or None,
-                "nombre_contacto":    lead.get("nombre_contacto"),
-                "cargo":              lead.get("cargo"),
-                "linkedin":           lead.get("linkedin"),
-                "whatsapp_valido":    lead.get("whatsapp_valido"),
-                "whatsapp_estado":    lead.get("whatsapp_estado", "pendiente"),
-                "fecha_verificacion": lead.get("fecha_verificacion"),
-                "fuente":             lead.get("fuente", "Desconocida"),
-                "fecha_extraccion":   lead.get("fecha_extraccion"),
-            }
-
+        recrear_trgm = leidos > UMBRAL_RECREAR_TRGM and _quitar_indice_trgm(conn)
+        usar_staging = staging or _tabla_vacia(conn)
+
+        with conn.cursor() as cur:
+            # Ingesta regenerable: no esperar el fsync del WAL en el commit
+            cur.execute("SET LOCAL synchronous_commit = off")
+            # Una sola vez: todas las tandas reutilizan el mismo plan
+            cur.execute(SQL_UPSERT_PREPARAR)
+        preparada = True
+
+        if usar_staging:
+            tardias: list[tuple] = []
             try:
-                cur.execute(SQL_UPSERT, params)
-                row = cur.fetchone()
-                if row and row[0]:
-                    insertados += 1
-                else:
-                    actualizados += 1
+                insertados, actualizados = _importar_staging(conn, filas_staging(tandas, tardias))
             except Exception as exc:
-                log.debug(f"   Error en lead '{lead.get('empresa')}': {exc}")
-                conn.rollback()
-                # Re-abrir cursor tras rollback parcial
-                cur = conn.cursor()
-                errores += 1
-                continue
+                usar_staging = False
+                log.warning(f"   ⚠️  Carga con COPY falló ({exc}). Usando upsert por lotes…")
+                # El COPY ya consumió el archivo: se vuelve a leer desde el principio
+                total = omitidos = fusionados = escritas = 0
+                tandas = _lotes(iter_leads(path), TAMANO_TANDA)
+            else:
+                # Repetidos de tandas anteriores: su teléfono ya está en `leads`
+                # y el ON CONFLICT los fusiona con las mismas reglas
+                tardias, n = _fusionar_repetidos(tardias)
+                _, _, fallidos = _importar_lotes(conn, tardias)
+                fusionados += n + len(tardias) - fallidos
+                escritas   += fallidos
+                errores    += fallidos
+
+        if not usar_staging:
+            # Entre tandas, los teléfonos repetidos los junta el ON CONFLICT
+            for filas in filas_por_tanda(tandas):
+                escritas += len(filas)
+                nuevos, existentes, fallidos = _importar_lotes(conn, filas)
+                insertados   += nuevos
+                actualizados += existentes
+                errores      += fallidos
 
         conn.commit()
 
@@ -446,43 +916,82 @@ def cmd_importar(input_path: str, nicho: str, expo_id: str | None):
         log.warning("   ⚠️  Importación interrumpida. Cambios revertidos.")
         sys.exit(1)
     finally:
-        cur.close()
+        if preparada:
+            _liberar_upsert(conn)
+        if recrear_trgm:
+            _recrear_indice_trgm(conn)
+
+    if fusionados:
+        log.info(f"   🔗  {fusionados} leads con teléfono repetido fusionados.")
+
+    # Filas que ya estaban en la BD con los mismos datos (no se reescriben)
+    sin_cambios = escritas - insertados - actualizados - errores
+    duracion    = (datetime.now() - inicio).total_seconds()
 
-    duracion = (datetime.now() - inicio).total_seconds()
+    if insertados or actualizados:
+        _analizar(conn)
 
     # Registrar en log de ejecuciones
     _registrar_ejecucion(conn, {
         "tipo":             "importacion",
         "nicho":            nicho,
         "archivo":          input_path,
-        "total_procesados": len(leads),
+        "total_procesados": total,
         "total_insertados": insertados + actualizados,
         "total_errores":    errores,
         "duracion_seg":     duracion,
-        "notas":            f"nuevos={insertados} actualizados={actualizados} omitidos={omitidos}",
+        "notas":            (f"nuevos={insertados} actualizados={actualizados} "
+                             f"sin_cambios={sin_cambios} fusionados={fusionados} omitidos={omitidos}"),
     })
-    conn.close()
-
-    print("\n" + "═" * 52)
-    print("  📥  RESUMEN DE IMPORTACIÓN")
-    print("═" * 52)
-    print(f"  Leads en archivo       : {len(leads)}")
-    print(f"  ✅  Insertados (nuevos) : {insertados}")
-    print(f"  🔄  Actualizados        : {actualizados}")
-    print(f"  ⏭️   Omitidos (vacíos)  : {omitidos}")
-    print(f"  ❌  Errores             : {errores}")
-    print(f"  ⏱️   Duración            : {duracion:.1f}s")
-    print("═" * 52 + "\n")
+    liberar(conn)
+
+    sys.stdout.write("\n".join([
+        "\n" + "═" * 52,
+        "  📥  RESUMEN DE IMPORTACIÓN",
+        "═" * 52,
+        f"  Leads en archivo       : {total}",
+        f"  ✅  Insertados (nuevos) : {insertados}",
+        f"  🔄  Actualizados        : {actualizados}",
+        f"  ⏸️   Sin cambios         : {sin_cambios}",
+        f"  🔗  Repetidos fusionados: {fusionados}",
+        f"  ⏭️   Omitidos (vacíos)  : {omitidos}",
+        f"  ❌  Errores             : {errores}",
+        f"  ⏱️   Duración            : {duracion:.1f}s",
+        "═" * 52 + "\n",
+    ]) + "\n")
 
 
 # ════════════════════════════════════════════════════════════════════════════
 # 3. EXPORTAR — Generar CSV para CRM (desde PostgreSQL)
 # ════════════════════════════════════════════════════════════════════════════
 
+class _EscritorCRLF:
+    """
+    Envuelve el archivo de salida de un COPY ... CSV: COPY termina los
+    registros con LF y csv.writer con CRLF. Convierte solo los saltos fuera
+    de comillas (los de dentro de un campo se dejan igual, como csv.writer).
+    """
+
+    def __init__(self, f):
+        self._f              = f
+        self._entre_comillas = False
+
+    def write(self, datos) -> None:
+        # Partes pares: fuera de comillas ("" de escape abre y cierra solo)
+        partes = bytes(datos).split(b'"')
+        for i in range(1 if self._entre_comillas else 0, len(partes), 2):
+            partes[i] = partes[i].replace(b"\n", b"\r\n")
+        if len(partes) % 2 == 0:
+            self._entre_comillas = not self._entre_comillas
+        self._f.write(b'"'.join(partes))
+
+
 def cmd_exportar(output_path: str, solo_validos: bool, nicho: str | None, expo_id: str | None):
     log.info(f"📤  Exportando leads desde PostgreSQL a CSV: {output_path}")
 
     conn = conectar()
+    # Conteo y COPY deben ver la misma foto de la tabla
+    conn.set_session(isolation_level="REPEATABLE READ", readonly=True)
     cur  = conn.cursor()
 
     # Construir query con filtros opcionales
@@ -500,47 +1009,64 @@ def cmd_exportar(output_path: str, solo_validos: bool, nicho: str | None, expo_i
 
     where = ("WHERE " + " AND ".join(condiciones)) if condiciones else ""
 
-    cols_sql = ", ".join(COLUMNAS_CSV)
+    # PostgreSQL genera el CSV con COPY. Todo se pasa a texto con COALESCE para
+    # que los NULL salgan como "" entrecomillado y los booleanos como
+    # True/False, igual que en exportar-json.
+    cols_sql = ", ".join(
+        f"COALESCE({_EXPR_CSV.get(col, col + '::text')}, '') AS {col}"
+        for col in COLUMNAS_CSV
+    )
     SQL = f"""
         SELECT {cols_sql}
         FROM leads
         {where}
-        ORDER BY nicho, delegacion, empresa
+        ORDER BY leads.nicho, leads.delegacion, leads.empresa, leads.id
+    """
+    SQL_CONTEO = f"""
+        SELECT COUNT(*), COUNT(*) FILTER (WHERE whatsapp_valido IS TRUE)
+        FROM leads
+        {where}
     """
 
     try:
-        cur.execute(SQL, params)
-        filas = cur.fetchall()
-    except Exception as exc:
-        log.error(f"❌  Error al consultar leads: {exc}")
-        sys.exit(1)
+        try:
+            cur.execute(SQL_CONTEO, params)
+            total, con_wa = cur.fetchone()
+        except Exception as exc:
+            log.error(f"❌  Error al consultar leads: {exc}")
+            sys.exit(1)
+
+        if not total:
+            log.warning("⚠️  No se encontraron leads con los filtros aplicados.")
+            return
+
+        copy_sql = (
+            f"COPY ({cur.mogrify(SQL, params).decode()}) TO STDOUT "
+            "WITH (FORMAT CSV, FORCE_QUOTE *, ENCODING 'UTF8')"
+        )
+
+        # Escribir CSV: BOM para Excel en Windows, encabezados y filas de COPY
+        path = Path(output_path)
+        with path.open("wb") as f:
+            f.write(b"\xef\xbb\xbf")
+            f.write((",".join(f'"{col}"' for col in COLUMNAS_CSV) + "\r\n").encode("utf-8"))
+            cur.copy_expert(copy_sql, _EscritorCRLF(f))
     finally:
         cur.close()
-        conn.close()
-
-    if not filas:
-        log.warning("⚠️  No se encontraron leads con los filtros aplicados.")
-        return
-
-    # Escribir CSV
-    path = Path(output_path)
-    with path.open("w", newline="", encoding="utf-8-sig") as f:  # utf-8-sig para Excel en Windows
-        writer = csv.writer(f, quoting=csv.QUOTE_ALL)
-        writer.writerow(COLUMNAS_CSV)  # encabezados
-        writer.writerows(filas)
-
-    con_wa = sum(1 for r in filas if r[COLUMNAS_CSV.index("whatsapp_valido")] is True)
-
-    print("\n" + "═" * 52)
-    print("  📤  RESUMEN DE EXPORTACIÓN (desde PostgreSQL)")
-    print("═" * 52)
-    print(f"  Total leads exportados : {len(filas)}")
-    print(f"  Con WhatsApp válido    : {con_wa}")
-    print(f"  Archivo CSV            : {output_path}")
-    print(f"  Encoding               : UTF-8 BOM (compatible Excel)")
-    print("═" * 52)
-    print("  ✅  Listo para importar a HubSpot, Pipedrive, Notion, etc.")
-    print("═" * 52 + "\n")
+        liberar(conn)
+
+    sys.stdout.write("\n".join([
+        "\n" + "═" * 52,
+        "  📤  RESUMEN DE EXPORTACIÓN (desde PostgreSQL)",
+        "═" * 52,
+        f"  Total leads exportados : {total}",
+        f"  Con WhatsApp válido    : {con_wa}",
+        f"  Archivo CSV            : {output_path}",
+        f"  Encoding               : UTF-8 BOM (compatible Excel)",
+        "═" * 52,
+        "  ✅  Listo para importar a HubSpot, Pipedrive, Notion, etc.",
+        "═" * 52 + "\n",
+    ]) + "\n")
 
 
 # ════════════════════════════════════════════════════════════════════════════
@@ -556,69 +1082,70 @@ def cmd_exportar_json(input_path: str, output_path: str, solo_validos: bool, nic
         log.error(f"❌  Archivo no encontrado: {input_path}")
         sys.exit(1)
 
-    raw = json.loads(path.read_text(encoding="utf-8"))
-    leads = raw["leads"] if isinstance(raw, dict) and "leads" in raw else raw
+    # Filtrar y escribir en una sola pasada: cada lead que pasa los filtros va
+    # directo al CSV (columnas en el orden de COLUMNAS_CSV; csv.writer ya
+    # escribe None como "" y los booleanos como True/False). El archivo se
+    # crea con el primer lead exportado.
+    out_path   = Path(output_path)
+    total      = 0
+    exportados = 0
+    con_wa     = 0
+    f = writer = None
+    try:
+        for lead in iter_leads(path):
+            total += 1
+            # Filtro por WhatsApp válido (a menos que se pida --todos)
+            if solo_validos and not lead.get("whatsapp_valido"):
+                continue
+            # Filtro por nicho
+            if nicho and lead.get("nicho") != nicho:
+                continue
+            # Filtro por expo_id (si existe en el lead, aunque normalmente no está en JSON)
+            if expo_id and lead.get("expo_id") != expo_id:
+                continue
 
-    if not leads:
+            if writer is None:
+                f = out_path.open("w", newline="", encoding="utf-8-sig")
+                writer = csv.writer(f, quoting=csv.QUOTE_ALL)
+                writer.writerow(COLUMNAS_CSV)
+            writer.writerow(tuple(map(lead.get, COLUMNAS_CSV)))
+            exportados += 1
+            if lead.get("whatsapp_valido") is True:
+                con_wa += 1
+    except BaseException:
+        # No dejar un CSV a medias (p. ej. JSON truncado)
+        if f is not None:
+            f.close()
+            out_path.unlink(missing_ok=True)
+        raise
+    if f is not None:
+        f.close()
+
+    if not total:
         log.warning("⚠️  El archivo no contiene leads.")
         return
 
-    log.info(f"   {len(leads)} leads en el archivo.")
-
-    # Aplicar filtros
-    filtrados = []
-    for lead in leads:
-        # Filtro por WhatsApp válido (a menos que se pida --todos)
-        if solo_validos and not lead.get("whatsapp_valido"):
-            continue
-        # Filtro por nicho
-        if nicho and lead.get("nicho") != nicho:
-            continue
-        # Filtro por expo_id (si existe en el lead, aunque normalmente no está en JSON)
-        if expo_id and lead.get("expo_id") != expo_id:
-            continue
-        filtrados.append(lead)
+    log.info(f"   {total} leads en el archivo.")
 
-    if not filtrados:
+    if not exportados:
         log.warning("⚠️  No hay leads después de aplicar los filtros.")
         return
 
-    # Preparar filas para CSV (en el mismo orden que COLUMNAS_CSV)
-    filas = []
-    for lead in filtrados:
-        fila = []
-        for col in COLUMNAS_CSV:
-            valor = lead.get(col)
-            # Convertir booleanos a string para que CSV los muestre como true/false
-            if isinstance(valor, bool):
-                valor = str(valor)
-            elif valor is None:
-                valor = ""
-            fila.append(valor)
-        filas.append(fila)
-
-    # Escribir CSV
-    out_path = Path(output_path)
-    with out_path.open("w", newline="", encoding="utf-8-sig") as f:
-        writer = csv.writer(f, quoting=csv.QUOTE_ALL)
-        writer.writerow(COLUMNAS_CSV)
-        writer.writerows(filas)
-
-    con_wa = sum(1 for l in filtrados if l.get("whatsapp_valido") is True)
-
     # Resumen que imprime (con manejo de errores de codificación)
     try:
-        print("\n" + "═" * 52)
-        print("  📤  RESUMEN DE EXPORTACIÓN (desde JSON)")
-        print("═" * 52)
-        print(f"  Leads en archivo JSON  : {len(leads)}")
-        print(f"  Leads después de filtros: {len(filtrados)}")
-        print(f"  Con WhatsApp válido    : {con_wa}")
-        print(f"  Archivo CSV            : {output_path}")
-        print(f"  Encoding               : UTF-8 BOM (compatible Excel)")
-        print("═" * 52)
-        print("  ✅  Listo para importar a CRM")
-        print("═" * 52 + "\n")
+        sys.stdout.write("\n".join([
+            "\n" + "═" * 52,
+            "  📤  RESUMEN DE EXPORTACIÓN (desde JSON)",
+            "═" * 52,
+            f"  Leads en archivo JSON  : {total}",
+            f"  Leads después de filtros: {exportados}",
+            f"  Con WhatsApp válido    : {con_wa}",
+            f"  Archivo CSV            : {output_path}",
+            f"  Encoding               : UTF-8 BOM (compatible Excel)",
+            "═" * 52,
+            "  ✅  Listo para importar a CRM",
+            "═" * 52 + "\n",
+        ]) + "\n")
     except UnicodeEncodeError:
         # Si falla la impresión por codificación, imprimimos una versión simple
         log.info("Exportación completada. (No se pudo mostrar el resumen por problemas de codificación)")
@@ -635,18 +1162,15 @@ def cmd_stats():
     cur  = conn.cursor()
 
     try:
-        # Total global
-        cur.execute("SELECT COUNT(*) FROM leads")
-        total = cur.fetchone()[0]
-
-        cur.execute("SELECT COUNT(*) FROM leads WHERE whatsapp_valido = TRUE")
-        wa_validos = cur.fetchone()[0]
-
-        cur.execute("SELECT COUNT(*) FROM leads WHERE whatsapp_valido IS NULL")
-        sin_verificar = cur.fetchone()[0]
-
-        cur.execute("SELECT COUNT(*) FROM leads WHERE email IS NOT NULL")
-        con_email = cur.fetchone()[0]
+        # Totales globales (un solo recorrido de la tabla)
+        cur.execute("""
+            SELECT COUNT(*),
+                   COUNT(*) FILTER (WHERE whatsapp_valido = TRUE),
+                   COUNT(*) FILTER (WHERE whatsapp_valido IS NULL),
+                   COUNT(*) FILTER (WHERE email IS NOT NULL)
+            FROM leads
+        """)
+        total, wa_validos, sin_verificar, con_email = cur.fetchone()
 
         # Stats por nicho y fuente (desde vista)
         cur.execute("SELECT * FROM v_stats")
@@ -676,48 +1200,52 @@ def cmd_stats():
 
     finally:
         cur.close()
-        conn.close()
+        liberar(conn)
 
     tasa = wa_validos * 100 // max(total - sin_verificar, 1) if total > 0 else 0
 
-    print("\n" + "═" * 62)
-    print("  📊  ESTADÍSTICAS DE BASE DE DATOS — leads_b2b")
-    print("═" * 62)
-    print(f"  Total leads             : {total:>6}")
-    print(f"  WhatsApp válidos        : {wa_validos:>6}  ({tasa}%)")
-    print(f"  Sin verificar           : {sin_verificar:>6}")
-    print(f"  Con email               : {con_email:>6}")
-    print()
+    # Se arma todo el reporte y se escribe de una vez al final
+    out = [
+        "\n" + "═" * 62,
+        "  📊  ESTADÍSTICAS DE BASE DE DATOS — leads_b2b",
+        "═" * 62,
+        f"  Total leads             : {total:>6}",
+        f"  WhatsApp válidos        : {wa_validos:>6}  ({tasa}%)",
+        f"  Sin verificar           : {sin_verificar:>6}",
+        f"  Con email               : {con_email:>6}",
+        "",
+    ]
 
     if stats_rows:
-        print(f"  {'NICHO':<20} {'FUENTE':<22} {'TOTAL':>6} {'✅WA':>5} {'%':>4} {'EMAIL':>6}")
-        print("  " + "─" * 60)
+        out.append(f"  {'NICHO':<20} {'FUENTE':<22} {'TOTAL':>6} {'✅WA':>5} {'%':>4} {'EMAIL':>6}")
+        out.append("  " + "─" * 60)
         for row in stats_rows:
             d = dict(zip(stats_cols, row))
             pct = d.get("tasa_whatsapp_pct") or 0
-            print(
+            out.append(
                 f"  {str(d['nicho']):<20} {str(d['fuente']):<22} "
                 f"{d['total']:>6} {d['whatsapp_validos']:>5} "
                 f"{pct:>3.0f}% {d['con_email']:>6}"
             )
-        print()
+        out.append("")
 
     if por_deleg:
-        print(f"  TOP DELEGACIONES/ALCALDÍAS")
-        print("  " + "─" * 40)
+        out.append(f"  TOP DELEGACIONES/ALCALDÍAS")
+        out.append("  " + "─" * 40)
         for deleg, tot, wa in por_deleg:
             bar = "█" * min(int(tot / max(total, 1) * 40), 20)
-            print(f"  {str(deleg):<28} {tot:>4}  WA:{wa:>3}  {bar}")
-        print()
+            out.append(f"  {str(deleg):<28} {tot:>4}  WA:{wa:>3}  {bar}")
+        out.append("")
 
     if ultimas:
-        print(f"  ÚLTIMAS EJECUCIONES")
-        print("  " + "─" * 55)
+        out.append(f"  ÚLTIMAS EJECUCIONES")
+        out.append("  " + "─" * 55)
         for tipo, nicho, procesados, insertados, dur, fecha in ultimas:
             fecha_str = fecha.strftime("%d/%m %H:%M") if fecha else "—"
-            print(f"  {fecha_str}  {str(tipo):<15} {str(nicho or ''):<18} +{insertados or 0}/{procesados or 0}")
+            out.append(f"  {fecha_str}  {str(tipo):<15} {str(nicho or ''):<18} +{insertados or 0}/{procesados or 0}")
 
-    print("═" * 62 + "\n")
+    out.append("═" * 62 + "\n")
+    sys.stdout.write("\n".join(out) + "\n")
 
 
 # ════════════════════════════════════════════════════════════════════════════
@@ -730,6 +1258,9 @@ def cmd_limpiar():
     cur  = conn.cursor()
 
     try:
+        # Cambios regenerables: no esperar el fsync del WAL en el commit
+        cur.execute("SET LOCAL synchronous_commit = off")
+
         # 1. Eliminar leads sin empresa Y sin teléfono Y sin email
         cur.execute("""
             DELETE FROM leads
@@ -740,64 +1271,98 @@ def cmd_limpiar():
         vacios = cur.rowcount
         log.info(f"   Eliminados vacíos totales   : {vacios}")
 
-        # 2. Normalizar empresa: trim y capitalizar
+        # 2-4. Un solo UPDATE: normalizar empresa (trim + capitalizar), email
+        # (minúsculas) y marcar 'sin_telefono' los que no tienen tel. Las
+        # condiciones se evalúan sobre los valores previos para contar cada caso.
         cur.execute("""
-            UPDATE leads
-            SET empresa = INITCAP(TRIM(empresa))
-            WHERE empresa IS NOT NULL
-              AND empresa != INITCAP(TRIM(empresa))
+            WITH pendientes AS (
+                SELECT id,
+                       empresa IS NOT NULL AND empresa != INITCAP(TRIM(empresa)) AS n_empresa,
+                       email   IS NOT NULL AND email   != LOWER(TRIM(email))     AS n_email,
+                       telefono IS NULL
+                           AND (whatsapp_estado IS NULL OR whatsapp_estado != 'sin_telefono') AS n_tel
+                FROM leads
+                WHERE (empresa IS NOT NULL AND empresa != INITCAP(TRIM(empresa)))
+                   OR (email   IS NOT NULL AND email   != LOWER(TRIM(email)))
+                   OR (telefono IS NULL
+                       AND (whatsapp_estado IS NULL OR whatsapp_estado != 'sin_telefono'))
+            ), actualizados AS (
+                UPDATE leads l
+                SET empresa         = CASE WHEN p.n_empresa THEN INITCAP(TRIM(l.empresa)) ELSE l.empresa END,
+                    email           = CASE WHEN p.n_email   THEN LOWER(TRIM(l.email))     ELSE l.email   END,
+                    whatsapp_estado = CASE WHEN p.n_tel THEN 'sin_telefono' ELSE l.whatsapp_estado END,
+                    whatsapp_valido = CASE WHEN p.n_tel THEN FALSE          ELSE l.whatsapp_valido END,
+                    fecha_actualizacion = NOW()
+                FROM pendientes p
+                WHERE l.id = p.id
+                RETURNING p.n_empresa, p.n_email, p.n_tel
+            )
+            SELECT COUNT(*) FILTER (WHERE n_empresa),
+                   COUNT(*) FILTER (WHERE n_email),
+                   COUNT(*) FILTER (WHERE n_tel)
+            FROM actualizados
         """)
-        normalizados = cur.rowcount
+        normalizados, emails_norm, sin_tel = cur.fetchone()
         log.info(f"   Empresas normalizadas        : {normalizados}")
-
-        # 3. Normalizar email a minúsculas
-        cur.execute("""
-            UPDATE leads
-            SET email = LOWER(TRIM(email))
-            WHERE email IS NOT NULL
-              AND email != LOWER(TRIM(email))
-        """)
-        emails_norm = cur.rowcount
         log.info(f"   Emails normalizados          : {emails_norm}")
-
-        # 4. Marcar como 'sin_telefono' los que whatsapp_estado es NULL y no tienen tel
-        cur.execute("""
-            UPDATE leads
-            SET whatsapp_estado = 'sin_telefono',
-                whatsapp_valido = FALSE
-            WHERE telefono IS NULL
-              AND (whatsapp_estado IS NULL OR whatsapp_estado != 'sin_telefono')
-        """)
-        sin_tel = cur.rowcount
         log.info(f"   Marcados sin_telefono        : {sin_tel}")
 
         conn.commit()
         log.info("   ✅  Limpieza completada.")
 
+        if vacios or normalizados or emails_norm or sin_tel:
+            _analizar(conn)
+
     except Exception as exc:
         conn.rollback()
         log.error(f"❌  Error durante limpieza: {exc}")
         sys.exit(1)
     finally:
         cur.close()
-        conn.close()
+        liberar(conn)
 
 
 # ════════════════════════════════════════════════════════════════════════════
 # 7. UTILIDADES INTERNAS
 # ════════════════════════════════════════════════════════════════════════════
 
+def _analizar(conn):
+    """ANALYZE de `leads` tras cambios masivos, para que el planificador use estadísticas frescas."""
+    inicio = datetime.now()
+    try:
+        with conn.cursor() as cur:
+            cur.execute("ANALYZE leads")
+        conn.commit()
+    except Exception as exc:
+        conn.rollback()
+        log.warning(f"   ⚠️  No se pudo ejecutar ANALYZE: {exc}")
+        return
+    log.info(f"   📈  Estadísticas del planificador actualizadas ({(datetime.now() - inicio).total_seconds():.2f}s)")
+
+
+_COLUMNAS_EJECUCION = ("tipo", "nicho", "archivo", "total_procesados",
+                       "total_insertados", "total_errores", "duracion_seg", "notas")
+
+
 def _registrar_ejecucion(conn, datos: dict):
     """Registra una ejecución en la tabla de log."""
+    _registrar_ejecuciones(conn, [datos])
+
+
+def _registrar_ejecuciones(conn, datos: list[dict]):
+    """
+    Registra varias ejecuciones en la tabla de log: un INSERT de hasta 500
+    filas por viaje al servidor y un solo commit al final.
+    """
+    from psycopg2.extras import execute_values
     try:
         cur = conn.cursor()
-        cur.execute("""
-            INSERT INTO ejecuciones
-                (tipo, nicho, archivo, total_procesados, total_insertados, total_errores, duracion_seg, notas)
-            VALUES
-                (%(tipo)s, %(nicho)s, %(archivo)s, %(total_procesados)s,
-                 %(total_insertados)s, %(total_errores)s, %(duracion_seg)s, %(notas)s)
-        """, datos)
+        execute_values(
+            cur,
+            f"INSERT INTO ejecuciones ({', '.join(_COLUMNAS_EJECUCION)}) VALUES %s",
+            [tuple(d[c] for c in _COLUMNAS_EJECUCION) for d in datos],
+            page_size=500,
+        )
         conn.commit()
         cur.close()
     except Exception as exc:
@@ -822,6 +1387,7 @@ def main():
             input_path=args.input,
             nicho=args.nicho,
             expo_id=args.expo,
+            staging=args.staging,
         )
 
     elif args.comando == "exportar":
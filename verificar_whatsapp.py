@@ -7,14 +7,17 @@
 ║  Entrada  : leads_raw.json  (salida de extractor_hibrido.py)            ║
 ║  Salida   : leads_verificados.json  →  alimenta n8n / PostgreSQL        ║
 ╠══════════════════════════════════════════════════════════════════════════╣
-║  Método   : WhatsApp Web automatizado con Playwright                    ║
+║  Método   : WhatsApp Web automatizado con Playwright (--mode web)       ║
 ║             → Verifica si un número tiene cuenta activa en WhatsApp     ║
+║             API de WhatsApp Business, endpoint contacts (--mode http)   ║
+║             → 50 números por petición, sin navegador                    ║
 ╠══════════════════════════════════════════════════════════════════════════╣
 ║  Protecciones anti-baneo:                                               ║
 ║    • Máx 40 verificaciones / hora (configurable)                        ║
 ║    • Delays aleatorios entre verificaciones (5-10 seg default)          ║
 ║    • Perfil persistente en disco → QR solo una vez                      ║
 ║    • Checkpoint automático cada 10 leads                                ║
+║    • Caché de números ya consultados (30 días, --sin-cache la omite)    ║
 ║    • Modo --mock para pruebas sin abrir WhatsApp                        ║
 ╠══════════════════════════════════════════════════════════════════════════╣
 ║  Uso:                                                                    ║
@@ -22,26 +25,51 @@
 ║    py -3.11 verificar_whatsapp.py             ← producción (headless)  ║
 ║    py -3.11 verificar_whatsapp.py --mock      ← prueba sin WhatsApp    ║
 ║    py -3.11 verificar_whatsapp.py --reanudar  ← continúa checkpoint    ║
+║    py -3.11 verificar_whatsapp.py --mode http ← por lotes vía API       ║
+╠══════════════════════════════════════════════════════════════════════════╣
+║  Variables de entorno (.env) para --mode http:                          ║
+║    WA_API_URL   → URL base de la API (p. ej. https://wa-api:9090)       ║
+║    WA_API_TOKEN → token Bearer de la API                                ║
 ╚══════════════════════════════════════════════════════════════════════════╝
 
 Dependencias:
     pip install playwright python-dotenv
     playwright install chromium
 
+Opcional (--mode http, verificación por lotes sin navegador):
+    pip install "httpx[http2]"
+
+Opcional (lectura y escritura más rápidas de leads, diario y checkpoint):
+    pip install orjson
+
+Opcional (lectura incremental de leads_raw.json grandes, memoria constante):
+    pip install ijson
+
+Opcional (event loop más rápido en Linux/macOS):
+    pip install uvloop
+
 ⚠️  IMPORTANTE: Usar cuenta WhatsApp desechable, no la personal.
 """
 
 import argparse
+import asyncio
+import atexit
+import hashlib
+import itertools
 import json
 import logging
+import mmap
 import os
 import random
 import re
+import sqlite3
 import sys
+import tempfile
 import time
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime
 from pathlib import Path
-from typing import Optional
+from typing import Iterable, Iterator, Optional
 
 try:
     from dotenv import load_dotenv
@@ -49,6 +77,36 @@ try:
 except ImportError:
     pass
 
+# Lectura incremental del JSON de entrada (opcional; sin él se carga completo)
+try:
+    import ijson
+except ImportError:
+    ijson = None
+
+# JSON en C para leer y escribir leads, diario y checkpoint (opcional; sin él se usa json)
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+# Cliente HTTP asíncrono para --mode http (opcional; sin él solo hay modo web)
+try:
+    import httpx
+except ImportError:
+    httpx = None
+
+# Event loop más rápido en Linux/macOS (opcional; sin él se usa el de asyncio)
+try:
+    import uvloop
+except ImportError:
+    uvloop = None
+
+# Código por lead (rate limiting, fecha, ETA, marcado): compilado con mypyc
+# si se construyó con `python setup.py build_ext --inplace`, si no el .py
+from hot import CAMPOS_VERIFICACION as _CAMPOS_VERIFICACION
+from hot import CubetaTokens, RateLimiter, hoy_iso, marcar_lead
+from hot import calcular_eta as _calcular_eta
+
 logging.basicConfig(
     level=logging.INFO,
     format="%(asctime)s  %(levelname)-8s  %(message)s",
@@ -63,11 +121,19 @@ log = logging.getLogger("verificador")
 
 DEFAULT_INPUT      = "leads_raw.json"
 DEFAULT_OUTPUT     = "leads_verificados.json"
-DEFAULT_CHECKPOINT = "checkpoint_verificacion.json"
+DEFAULT_CHECKPOINT = "checkpoint_verificacion.db"
+CHECKPOINT_JSON    = "checkpoint_verificacion.json"  # formato anterior, se migra al reanudar
 DEFAULT_MAX_HORA   = 40
 DEFAULT_PAUSA_SEG  = 5
 DEFAULT_PAUSA_MAX  = 10
 DEFAULT_PROFILE    = "whatsapp_profile"  # carpeta para el perfil persistente
+DEFAULT_PAGINAS    = 1   # WhatsApp Web deja activa una sola pestaña por sesión
+DEFAULT_CACHE_DIAS = 30  # vigencia de un resultado en la caché de números
+WA_API_URL         = os.getenv("WA_API_URL", "")
+WA_API_TOKEN       = os.getenv("WA_API_TOKEN", "")
+
+# Todo lo que no sea dígito (para dejar el teléfono como lo espera WhatsApp)
+_TEL_NO_DIGITO = re.compile(r"\D")
 
 
 def parse_args() -> argparse.Namespace:
@@ -87,117 +153,448 @@ def parse_args() -> argparse.Namespace:
                    help=f"Pausa máxima en seg (default: {DEFAULT_PAUSA_MAX})")
     p.add_argument("--profile",   default=DEFAULT_PROFILE,
                    help=f"Carpeta para el perfil persistente de Chrome (default: {DEFAULT_PROFILE})")
+    p.add_argument("--paginas",   type=int, default=DEFAULT_PAGINAS,
+                   help=f"Pestañas de WhatsApp Web verificando en paralelo en --mode web "
+                        f"(default: {DEFAULT_PAGINAS})")
+    p.add_argument("--mode",      choices=("web", "http"),
+                   default="http" if WA_API_URL and WA_API_TOKEN else "web",
+                   help="web = WhatsApp Web con Playwright; http = lotes vía API de "
+                        "WhatsApp Business (default: http si WA_API_URL y WA_API_TOKEN "
+                        "están definidos, si no web)")
+    p.add_argument("--guardar-estado", metavar="RUTA",
+                   help="Tras iniciar sesión, guardar cookies y almacenamiento de "
+                        "WhatsApp Web en RUTA (p. ej. storage_state.json)")
+    p.add_argument("--cargar-estado", metavar="RUTA",
+                   help="Usar la sesión guardada en RUTA en un contexto nuevo en vez "
+                        "del perfil persistente (permite varios procesos a la vez)")
+    p.add_argument("--recursos-completos", action="store_true",
+                   help="No bloquear imágenes, fuentes ni CSS en WhatsApp Web "
+                        "(siempre se cargan con --debug)")
     p.add_argument("--mock",      action="store_true",
                    help="Modo prueba: sin abrir WhatsApp real")
     p.add_argument("--reanudar",  action="store_true",
                    help="Reanudar desde checkpoint anterior")
+    p.add_argument("--sin-cache", action="store_true",
+                   help="No consultar ni guardar la caché de números ya verificados")
+    p.add_argument("--cache-dias", type=int, default=DEFAULT_CACHE_DIAS,
+                   help=f"Días que vale un resultado en la caché (default: {DEFAULT_CACHE_DIAS})")
     p.add_argument("--debug",     action="store_true",
                    help="Navegador visible + logging detallado (necesario para escanear QR)")
-    return p.parse_args()
+    args = p.parse_args()
+    # Con 0 la cubeta de tokens no se rellena nunca (y divide entre cero)
+    if args.max_hora <= 0:
+        p.error("--max-hora debe ser mayor que 0")
+    return args
 
 
 # ════════════════════════════════════════════════════════════════════════════
 # 1. CARGA Y GUARDADO DE DATOS
 # ════════════════════════════════════════════════════════════════════════════
 
-def cargar_leads(input_path: str) -> list:
+def _leer_json(path) -> object:
+    """
+    Con orjson parsea el archivo mapeado en memoria, directo desde las
+    páginas del archivo y sin copiarlo antes a un bytes/str de Python.
+    """
+    if orjson is None:
+        return json.loads(Path(path).read_text(encoding="utf-8"))
+    with open(path, "rb") as f, mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+        with memoryview(mm) as buf:
+            return orjson.loads(buf)
+
+
+def _dumps(obj, indentar: bool = True) -> bytes:
+    """{obj} como JSON en UTF-8 (con orjson si está disponible)."""
+    if orjson:
+        return orjson.dumps(obj, option=orjson.OPT_INDENT_2 if indentar else 0)
+    formato = {"indent": 2} if indentar else {"separators": (",", ":")}
+    return json.dumps(obj, ensure_ascii=False, **formato).encode("utf-8")
+
+
+def _escribir_json(obj, path: str, indentar: bool = True):
+    """
+    Serializa {obj} a un .tmp y lo renombra con os.replace: un corte a
+    mitad de escritura nunca deja el archivo truncado.
+    Con indentar=False se escribe compacto, en una línea.
+    """
+    tmp = f"{path}.tmp"
+    Path(tmp).write_bytes(_dumps(obj, indentar))
+    os.replace(tmp, path)
+
+
+def _escribir_json_leads(metadata: dict, leads: Iterable[dict], path: str):
+    """
+    Escribe `{"metadata": ..., "leads": [...]}` con el mismo formato que
+    _escribir_json, pero lead por lead desde {leads} (sin armar la lista).
+    """
+    tmp = f"{path}.tmp"
+    with open(tmp, "wb", buffering=1 << 20) as f:
+        # Cabecera: el objeto con solo "metadata", sin el "\n}" final
+        f.write(_dumps({"metadata": metadata})[:-2])
+        f.write(b',\n  "leads": [')
+        separador = b"\n    "
+        for lead in leads:
+            f.write(separador)
+            f.write(_dumps(lead).replace(b"\n", b"\n    "))
+            separador = b",\n    "
+        f.write(b"]\n}" if separador == b"\n    " else b"\n  ]\n}")
+    os.replace(tmp, path)
+
+
+def _linea_json(obj) -> bytes:
+    """Una línea de .jsonl en UTF-8 (para archivos abiertos en binario)."""
+    if orjson:
+        return orjson.dumps(obj, option=orjson.OPT_APPEND_NEWLINE)
+    return (json.dumps(obj, ensure_ascii=False) + "\n").encode("utf-8")
+
+
+def iter_leads(input_path: str) -> Iterator[dict]:
+    """
+    Genera los leads de `{"leads": [...]}` o de una lista. Con ijson se leen
+    de forma incremental, un lead a la vez, sin cargar todo el archivo.
+    """
     path = Path(input_path)
     if not path.exists():
         log.error(f"❌  Archivo no encontrado: {input_path}")
         log.error("   Asegúrate de correr primero: extractor_hibrido.py")
         sys.exit(1)
-    raw = json.loads(path.read_text(encoding="utf-8"))
-    return raw["leads"] if isinstance(raw, dict) and "leads" in raw else raw
+
+    if ijson is None:
+        raw = _leer_json(path)
+        yield from raw["leads"] if isinstance(raw, dict) and "leads" in raw else raw
+        return
+
+    with path.open("rb") as f:
+        # El primer carácter significativo dice si es lista u objeto
+        inicio = f.read(64).lstrip(b"\xef\xbb\xbf \t\r\n")[:1]
+        f.seek(0)
+        prefijo = "item" if inicio == b"[" else "leads.item"
+        yield from ijson.items(f, prefijo, use_float=True)
+
+
+def _tel(telefono):
+    """
+    Teléfono internado (sys.intern): el mismo número leído de la entrada,
+    del checkpoint o del diario es un solo objeto, y las búsquedas en los
+    sets/dicts de teléfonos se resuelven por identidad.
+    """
+    return sys.intern(telefono) if type(telefono) is str else telefono
 
 
-def cargar_checkpoint(path: str) -> set:
+def _iter_jsonl(path: str) -> Iterator[dict]:
+    cargar = orjson.loads if orjson else json.loads
+    with open(path, "rb") as f:
+        for linea in f:
+            yield cargar(linea)
+
+
+def preparar_entrada(input_path: str, verificados: dict, procesados: set,
+                     directorio: str = ".") -> tuple[str, str, dict]:
+    """
+    Una sola pasada sobre {input_path}: los leads con teléfono van a un .jsonl
+    temporal (con el resultado de {verificados} si ya lo tenían) y los sin
+    teléfono, ya marcados como inválidos, a otro. Así la verificación lee
+    un lead a la vez y nunca hay dos listas con todos los leads en memoria.
+    Devuelve (ruta_con_tel, ruta_sin_tel, conteos).
+    """
+    hoy     = hoy_iso()
+    conteos = {"total": 0, "con_tel": 0, "sin_tel": 0, "pendientes": 0, "ya_listos": 0}
+    por_verificar = set()
+
+    def temporal(prefijo: str):
+        return tempfile.NamedTemporaryFile("wb", prefix=prefijo, suffix=".jsonl",
+                                           dir=directorio, delete=False)
+
+    con_tel, sin_tel = temporal(".con_tel_"), temporal(".sin_tel_")
     try:
-        data = json.loads(Path(path).read_text(encoding="utf-8"))
-        tels = set(data.get("procesados", []))
+        with con_tel, sin_tel:
+            for lead in iter_leads(input_path):
+                conteos["total"] += 1
+                telefono = lead.get("telefono")
+                if telefono:
+                    telefono = _tel(telefono)
+                    conteos["con_tel"] += 1
+                    if telefono in procesados:
+                        conteos["ya_listos"] += 1
+                        lead.update(verificados.get(telefono, ()))
+                    else:
+                        por_verificar.add(telefono)
+                    con_tel.write(_linea_json(lead))
+                else:
+                    conteos["sin_tel"] += 1
+                    lead["whatsapp_valido"]    = False
+                    lead["whatsapp_estado"]    = "sin_telefono"
+                    lead["fecha_verificacion"] = hoy
+                    sin_tel.write(_linea_json(lead))
+    except BaseException:
+        # Entrada inexistente o JSON inválido: no dejar temporales a medias
+        _borrar_temporales(con_tel.name, sin_tel.name)
+        raise
+
+    # Los teléfonos repetidos se verifican una sola vez
+    conteos["pendientes"] = len(por_verificar)
+    return con_tel.name, sin_tel.name, conteos
+
+
+class Checkpoint:
+    """
+    Teléfonos ya procesados en SQLite (modo WAL): cada número es un INSERT
+    y el commit se hace cada {lote} números, en vez de reescribir un JSON
+    con todo el conjunto.
+    """
+
+    def __init__(self, path: str, lote: int = 10):
+        self.path  = path
+        self.lote  = lote
+        self._sin_commit = 0
+        self._conn = sqlite3.connect(path)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS procesados (tel TEXT PRIMARY KEY) WITHOUT ROWID"
+        )
+        self._conn.commit()
+
+    def cargar(self) -> set:
+        tels = {_tel(tel) for (tel,) in self._conn.execute("SELECT tel FROM procesados")}
         log.info(f"   📂  Checkpoint cargado: {len(tels)} teléfonos ya procesados.")
         return tels
+
+    def vaciar(self):
+        self._conn.execute("DELETE FROM procesados")
+        self._conn.commit()
+
+    def add(self, tel: str):
+        self._conn.execute("INSERT OR IGNORE INTO procesados (tel) VALUES (?)", (tel,))
+        self._sin_commit += 1
+
+    def add_many(self, tels):
+        self._conn.executemany("INSERT OR IGNORE INTO procesados (tel) VALUES (?)",
+                               ((t,) for t in tels))
+        self.commit()
+
+    def commit_if_batch(self):
+        if self._sin_commit >= self.lote:
+            self.commit()
+
+    def commit(self):
+        self._conn.commit()
+        self._sin_commit = 0
+
+    def cerrar(self):
+        self.commit()
+        self._conn.close()
+
+
+class PhoneCache:
+    """
+    Caché "número → tiene WhatsApp" en la misma base SQLite del checkpoint,
+    con su propia tabla. La clave es el md5 del número normalizado (solo
+    dígitos) y cada resultado caduca a los {ttl_dias}. Los INSERT viajan en
+    los commits del checkpoint.
+    """
+
+    def __init__(self, checkpoint: Checkpoint, ttl_dias: int = DEFAULT_CACHE_DIAS):
+        self.ttl   = ttl_dias * 86400
+        self._conn = checkpoint._conn
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS wa_cache "
+            "(tel TEXT PRIMARY KEY, valid INTEGER NOT NULL, expires INTEGER NOT NULL) "
+            "WITHOUT ROWID"
+        )
+        self._conn.execute("DELETE FROM wa_cache WHERE expires < ?", (int(time.time()),))
+        self._conn.commit()
+
+    @staticmethod
+    def _clave(tel: str) -> str:
+        return hashlib.md5(_TEL_NO_DIGITO.sub("", tel).encode()).hexdigest()
+
+    def get(self, tel: str) -> Optional[bool]:
+        fila = self._conn.execute(
+            "SELECT valid FROM wa_cache WHERE tel = ? AND expires >= ?",
+            (self._clave(tel), int(time.time())),
+        ).fetchone()
+        return None if fila is None else bool(fila[0])
+
+    def set(self, tel: str, valid: bool, ttl: Optional[int] = None):
+        expira = int(time.time()) + (self.ttl if ttl is None else ttl)
+        self._conn.execute(
+            "INSERT OR REPLACE INTO wa_cache (tel, valid, expires) VALUES (?, ?, ?)",
+            (self._clave(tel), int(valid), expira),
+        )
+
+
+def cargar_checkpoint_json(path: str) -> set:
+    """Checkpoint en el formato JSON anterior (solo para migrarlo)."""
+    try:
+        data = _leer_json(path)
+        return {_tel(tel) for tel in data.get("procesados", [])}
     except Exception:
         return set()
 
 
-def guardar_checkpoint(path: str, procesados: set):
-    Path(path).write_text(
-        json.dumps({"procesados": list(procesados)}, ensure_ascii=False, indent=2),
-        encoding="utf-8",
-    )
+def cargar_diario(path: str) -> dict:
+    """
+    Lee el diario .jsonl de una ejecución anterior y devuelve
+    {telefono: campos de verificación}. Ignora una última línea truncada.
+    """
+    verificados = {}
+    try:
+        with Path(path).open(encoding="utf-8") as f:
+            for linea in f:
+                try:
+                    lead = json.loads(linea)
+                except json.JSONDecodeError:
+                    continue
+                verificados[_tel(lead["telefono"])] = {c: lead.get(c) for c in _CAMPOS_VERIFICACION}
+    except FileNotFoundError:
+        pass
+    return verificados
+
+
+def anexar_diario(fp, lead: dict):
+    """Persiste el lead verificado de inmediato (una línea JSON) para poder reanudar."""
+    fp.write(_linea_json(lead))
+    fp.flush()
 
 
-def guardar_resultados(leads: list, output_path: str):
-    verificados = sum(1 for l in leads if l.get("whatsapp_valido") is not None)
-    con_wa      = sum(1 for l in leads if l.get("whatsapp_valido") is True)
-    output = {
-        "metadata": {
-            "total_leads":        len(leads),
-            "total_verificados":  verificados,
-            "whatsapp_validos":   con_wa,
-            "whatsapp_invalidos": verificados - con_wa,
-            "pendientes":         len(leads) - verificados,
-            "tasa_validacion":    f"{con_wa * 100 // max(verificados, 1)}%",
-            "fecha_verificacion": datetime.now().isoformat(),
-            "version_script":     "2.1.0",
-        },
-        "leads": leads,
+def guardar_progreso(path: str, **conteos):
+    """
+    Sidecar pequeño con el avance de la ejecución (el output completo se
+    escribe al final). Se reescribe cada 10 leads: va compacto, sin indentar.
+    """
+    _escribir_json({**conteos, "actualizado": datetime.now().isoformat()}, path, indentar=False)
+
+
+def contar_resultados(leads: Iterable[dict]) -> tuple[int, int, int, int, int]:
+    """
+    Una sola pasada sobre {leads}.
+    Devuelve (total, verificados, válidos, inválidos, sin_teléfono).
+    """
+    total = verificados = validos = invalidos = sin_tel = 0
+    for lead in leads:
+        total += 1
+        get   = lead.get
+        valor = get("whatsapp_valido")
+        if valor is not None:
+            verificados += 1
+            if valor is True:
+                validos += 1
+            elif valor is False:
+                invalidos += 1
+        if get("whatsapp_estado") == "sin_telefono":
+            sin_tel += 1
+    return total, verificados, validos, invalidos, sin_tel
+
+
+def guardar_resultados(leads: Iterable[dict], output_path: str, conteo: tuple):
+    """
+    Escribe {leads} a {output_path} a medida que llegan; {conteo} es el de
+    contar_resultados() sobre los mismos leads (la metadata va primero).
+    """
+    total, verificados, con_wa, _, _ = conteo
+    metadata = {
+        "total_leads":        total,
+        "total_verificados":  verificados,
+        "whatsapp_validos":   con_wa,
+        "whatsapp_invalidos": verificados - con_wa,
+        "pendientes":         total - verificados,
+        "tasa_validacion":    f"{con_wa * 100 // max(verificados, 1)}%",
+        "fecha_verificacion": datetime.now().isoformat(),
+        "version_script":     "2.1.0",
     }
-    Path(output_path).write_text(
-        json.dumps(output, ensure_ascii=False, indent=2),
-        encoding="utf-8",
-    )
+    _escribir_json_leads(metadata, leads, output_path)
 
 
 # ════════════════════════════════════════════════════════════════════════════
 # 2. VERIFICADOR PRINCIPAL — WhatsApp Web vía Playwright con perfil persistente
 # ════════════════════════════════════════════════════════════════════════════
 
+# Consulta directa a WhatsApp Web (sin recargar la app). Se registra como
+# init script del contexto para que sobreviva a las navegaciones; devuelve
+# null si window.Store no está expuesto (p. ej. sin un inyector tipo
+# whatsapp-web.js), y entonces se vuelve a la navegación por send?phone=.
+JS_QUERY_EXIST = """
+window.__checkWA = async (numero) => {
+    const wap = window.Store && window.Store.WapQuery;
+    if (!wap || typeof wap.queryExist !== "function") return null;
+    const r = await wap.queryExist(numero + "@c.us");
+    return Boolean(r && (r.wid || r.jid || r.status === 200));
+};
+"""
+
+
 class VerificadorWhatsApp:
     """
     Verifica si un número tiene cuenta activa en WhatsApp usando
     WhatsApp Web automatizado con Playwright y un perfil persistente.
+    Mantiene un pool de {paginas} pestañas en el mismo contexto: cada
+    verificación toma una de la cola, navega y la devuelve al terminar.
     """
 
+    # Elementos característicos de la interfaz principal (sesión iniciada)
+    SELECTORES_SESION = (
+        "div[data-testid='chat-list']",                    # Lista de chats
+        "div[data-testid='conversation-panel-messages']",  # Panel de mensajes
+        "div[aria-label*='chat' i]",                       # ARIA label con 'chat'
+        "button[aria-label='Nuevo chat']",                 # Botón nuevo chat
+        "div[data-testid='chat-list-search']",             # Buscador de chats
+    )
+    COMBINED_SELECTOR = ", ".join(SELECTORES_SESION)
+
+    # Al abrir send?phone=: input del chat (tiene WhatsApp) o aviso de error
+    SEL_VALID = (
+        "footer[data-testid='conversation-compose-box-input'], "
+        "div[data-testid='chat-input'], "
+        "div[role='textbox']"  # selector genérico del input
+    )
+    SEL_WAIT = f"{SEL_VALID}, div._2pf_-, div[data-testid='intro-title']"
+
+    # Recursos que la verificación no necesita (solo mira el DOM)
+    RECURSOS_BLOQUEADOS = frozenset({"image", "media", "font", "stylesheet"})
+
     def __init__(self, profile_dir: str, headless: bool = True,
-                 pausa_min: int = 5, pausa_max: int = 10):
+                 pausa_min: int = 5, pausa_max: int = 10, paginas: int = 1,
+                 bloquear_recursos: bool = True, cargar_estado: Optional[str] = None,
+                 guardar_estado: Optional[str] = None):
         self.profile_dir      = Path(profile_dir).absolute()
         self.headless         = headless
         self.pausa_min        = pausa_min
         self.pausa_max        = pausa_max
+        self.paginas          = max(1, paginas)
+        self.bloquear_recursos = bloquear_recursos
+        self.cargar_estado    = cargar_estado
+        self.guardar_estado   = guardar_estado
         self._browser         = None
         self._context         = None
         self._page            = None
+        self._paginas: Optional[asyncio.Queue] = None
         self._sesion_iniciada = False
+        self._consulta_js     = True   # se desactiva si window.Store no existe
         self._pw              = None
 
-    def iniciar(self):
-        """Lanza Playwright con perfil persistente y abre WhatsApp Web."""
+    async def iniciar(self):
+        """
+        Lanza Playwright y abre WhatsApp Web: con el perfil persistente o,
+        con {cargar_estado}, en un contexto nuevo a partir de ese snapshot
+        (sin bloquear la carpeta del perfil, así pueden correr varios procesos).
+        """
         try:
-            from playwright.sync_api import sync_playwright
+            from playwright.async_api import async_playwright
         except ImportError:
             log.error("❌  playwright no instalado:")
             log.error("   pip install playwright && playwright install chromium")
             sys.exit(1)
 
-        # ── Fix Windows Python 3.11+ ─────────────────────────────────────────
-        if sys.platform == "win32":
-            import asyncio
-            asyncio.set_event_loop_policy(asyncio.WindowsProactorEventLoopPolicy())
-
-        log.info(f"   📁  Perfil persistente: {self.profile_dir}")
-
-        self._pw = sync_playwright().__enter__()
+        self._pw = await async_playwright().start()
 
         # Usamos Chromium de Playwright para consistencia entre plataformas
-        self._browser = self._pw.chromium.launch_persistent_context(
-            user_data_dir=str(self.profile_dir),
-            headless=self.headless,
-            args=[
-                "--no-sandbox",
-                "--disable-dev-shm-usage",
-                "--disable-blink-features=AutomationControlled",
-            ],
+        args_chromium = [
+            "--no-sandbox",
+            "--disable-dev-shm-usage",
+            "--disable-blink-features=AutomationControlled",
+        ]
+        opciones_contexto = dict(
             user_agent=(
                 "Mozilla/5.0 (Windows NT 10.0; Win64; x64) "
                 "AppleWebKit/537.36 (KHTML, like Gecko) "
@@ -208,18 +605,53 @@ class VerificadorWhatsApp:
             viewport={"width": 1280, "height": 800},
         )
 
-        # `launch_persistent_context` devuelve directamente el contexto
-        self._context = self._browser
-        self._page = self._context.new_page()
-        self._abrir_whatsapp_web()
-
-    def _abrir_whatsapp_web(self):
+        if self.cargar_estado:
+            log.info(f"   📁  Sesión desde snapshot: {self.cargar_estado}")
+            self._browser = await self._pw.chromium.launch(
+                headless=self.headless, args=args_chromium)
+            self._context = await self._browser.new_context(
+                storage_state=self.cargar_estado, **opciones_contexto)
+        else:
+            log.info(f"   📁  Perfil persistente: {self.profile_dir}")
+            self._browser = await self._pw.chromium.launch_persistent_context(
+                user_data_dir=str(self.profile_dir),
+                headless=self.headless,
+                args=args_chromium,
+                **opciones_contexto,
+            )
+            # `launch_persistent_context` devuelve directamente el contexto
+            self._context = self._browser
+
+        await self._context.add_init_script(JS_QUERY_EXIST)
+        if self.bloquear_recursos:
+            await self._context.route("**/*", self._bloquear_recurso)
+        self._page = await self._context.new_page()
+        await self._abrir_whatsapp_web()
+        if self.guardar_estado:
+            await self._guardar_estado()
+
+        # Pool de páginas: la primera ya tiene la sesión abierta
+        self._paginas = asyncio.Queue()
+        self._paginas.put_nowait(self._page)
+        for _ in range(self.paginas - 1):
+            self._paginas.put_nowait(await self._context.new_page())
+        if self.paginas > 1:
+            log.info(f"   🗂️   {self.paginas} pestañas de verificación en paralelo.")
+
+    async def _bloquear_recurso(self, route):
+        """Aborta imágenes, media, fuentes y CSS; deja pasar lo demás."""
+        if route.request.resource_type in self.RECURSOS_BLOQUEADOS:
+            await route.abort()
+        else:
+            await route.continue_()
+
+    async def _abrir_whatsapp_web(self):
         """Navega a WhatsApp Web y espera sesión activa o QR."""
         log.info("   📱  Abriendo WhatsApp Web...")
-        self._page.goto("https://web.whatsapp.com", wait_until="domcontentloaded", timeout=30_000)
+        await self._page.goto("https://web.whatsapp.com", wait_until="domcontentloaded", timeout=30_000)
 
         # Verificar si ya hay sesión activa (usando múltiples selectores)
-        if self._detectar_sesion_activa():
+        if await self._detectar_sesion_activa():
             log.info("   ✅  Sesión activa encontrada — no se requiere QR.")
             self._sesion_iniciada = True
             return
@@ -231,16 +663,16 @@ class VerificadorWhatsApp:
             log.error("❌  No hay sesión guardada y el navegador está en headless.")
             log.error("   Solución: ejecuta UNA VEZ con --debug para escanear el QR:")
             log.error("   py -3.11 verificar_whatsapp.py --debug")
-            self.cerrar()
+            await self.cerrar()
             sys.exit(1)
 
         # Modo visible — esperar a que aparezca el QR
         log.info("   ⏳  Esperando que cargue el QR...")
-        time.sleep(5)  # tiempo para que se pinte el canvas
+        await asyncio.sleep(5)  # tiempo para que se pinte el canvas
 
         # Traer ventana al frente
         try:
-            self._page.bring_to_front()
+            await self._page.bring_to_front()
         except Exception:
             pass
 
@@ -250,122 +682,203 @@ class VerificadorWhatsApp:
         log.warning("   📷  ════════════════════════════════════════")
 
         # Esperar hasta 180 segundos a que aparezca algún indicador de sesión
-        inicio_qr = time.time()
-        while time.time() - inicio_qr < 180:
-            if self._detectar_sesion_activa():
-                log.info("   ✅  QR escaneado correctamente.")
-                self._sesion_iniciada = True
-                return
-            time.sleep(2)
+        if await self._detectar_sesion_activa(timeout=180_000):
+            log.info("   ✅  QR escaneado correctamente.")
+            self._sesion_iniciada = True
+            return
 
         # Si llegamos aquí, no se detectó sesión
         log.error("❌  No se completó el escaneo del QR en 180 segundos.")
         log.error(f"   URL actual: {self._page.url}")
-        log.error(f"   Título: {self._page.title()}")
-        self.cerrar()
+        log.error(f"   Título: {await self._page.title()}")
+        await self.cerrar()
         sys.exit(1)
 
-    def _detectar_sesion_activa(self) -> bool:
+    async def _detectar_sesion_activa(self, timeout: int = 3000) -> bool:
         """
         Intenta detectar si ya hay sesión iniciada en WhatsApp Web.
-        Retorna True si encuentra algún elemento característico de la interfaz principal.
+        Retorna True si en {timeout} ms aparece cualquiera de SELECTORES_SESION
+        (una sola espera sobre el selector combinado).
         """
-        selectores = [
-            "div[data-testid='chat-list']",                # Lista de chats
-            "div[data-testid='conversation-panel-messages']",  # Panel de mensajes
-            "div[aria-label*='chat' i]",                   # ARIA label con 'chat'
-            "button[aria-label='Nuevo chat']",             # Botón nuevo chat
-            "div[data-testid='chat-list-search']",         # Buscador de chats
-        ]
-        for selector in selectores:
-            try:
-                elemento = self._page.wait_for_selector(selector, timeout=3000, state="visible")
-                if elemento:
-                    log.debug(f"   ✅  Sesión detectada con selector: {selector}")
-                    return True
-            except Exception:
-                continue
-        return False
+        try:
+            elemento = await self._page.wait_for_selector(
+                self.COMBINED_SELECTOR, timeout=timeout, state="visible")
+        except Exception:
+            return False
+        log.debug("   ✅  Sesión detectada.")
+        return elemento is not None
 
-    def cerrar(self):
+    async def _guardar_estado(self):
+        """Guarda cookies y almacenamiento de la sesión en {guardar_estado}."""
+        try:
+            # WhatsApp Web guarda la sesión en IndexedDB (Playwright >= 1.51)
+            await self._context.storage_state(path=self.guardar_estado, indexed_db=True)
+        except TypeError:
+            log.warning("   ⚠️  Playwright sin soporte de IndexedDB en storage_state: "
+                        "el snapshot puede no conservar la sesión.")
+            await self._context.storage_state(path=self.guardar_estado)
+        log.info(f"   💾  Sesión guardada en {self.guardar_estado} (úsala con --cargar-estado).")
+
+    async def cerrar(self):
         """Cierra el navegador (el perfil se guarda automáticamente)."""
         try:
             if self._context:
-                self._context.close()
+                await self._context.close()
+            if self._browser is not self._context:
+                await self._browser.close()
         except Exception:
             pass
         try:
             if self._pw:
-                self._pw.stop()
+                await self._pw.stop()
         except Exception:
             pass
         log.info("   🔒  Navegador cerrado (perfil guardado).")
 
-    def verificar(self, telefono: str) -> bool:
+    async def verificar(self, telefono: str) -> bool:
         """
-        Verifica si {telefono} tiene WhatsApp activo.
+        Verifica si {telefono} tiene WhatsApp activo en la primera pestaña libre.
         Devuelve True = tiene WhatsApp / False = no tiene o error.
         """
         if not self._sesion_iniciada:
             return False
 
-        numero_limpio = re.sub(r"[^\d]", "", telefono)
+        page = await self._paginas.get()
+        try:
+            return await self._verificar_en(page, telefono)
+        finally:
+            self._paginas.put_nowait(page)
 
+    async def _consultar_js(self, page, numero_limpio: str) -> Optional[bool]:
+        """
+        Pregunta por {numero_limpio} a la app ya cargada en {page}.
+        Devuelve None si la consulta directa no sirve (se usa la navegación).
+        """
+        if not (self._consulta_js and page.url.startswith("https://web.whatsapp.com")):
+            return None
         try:
-            url = f"https://web.whatsapp.com/send?phone={numero_limpio}"
-            self._page.goto(url, wait_until="domcontentloaded", timeout=30_000)
-
-            # Esperar hasta 30 segundos a que aparezca el input o el error
-            selector_esperado = (
-                "footer[data-testid='conversation-compose-box-input'], "
-                "div[data-testid='chat-input'], "
-                "div[role='textbox'], "  # selector genérico del input
-                "div._2pf_-, "
-                "div[data-testid='intro-title']"
-            )
-            self._page.wait_for_selector(selector_esperado, timeout=30_000)
+            resultado = await page.evaluate("(n) => window.__checkWA(n)", numero_limpio)
+        except Exception as exc:
+            log.debug(f"   Consulta directa falló para {numero_limpio}: {exc}")
+            return None
+        if resultado is None:
+            self._consulta_js = False
+            log.info("   ℹ️   WhatsApp Web no expone Store: se verifica navegando a cada número.")
+        return resultado
 
-            # Si aparece el input del chat → número tiene WhatsApp
-            input_chat = self._page.query_selector(
-                "footer[data-testid='conversation-compose-box-input'], "
-                "div[data-testid='chat-input'], "
-                "div[role='textbox']"
-            )
-            if input_chat:
-                return True
+    async def _verificar_en(self, page, telefono: str) -> bool:
+        numero_limpio = _TEL_NO_DIGITO.sub("", telefono)
 
-            # Si aparece error → número no tiene WhatsApp
-            error_el = self._page.query_selector("div._2pf_-")
-            if error_el:
-                return False
+        resultado = await self._consultar_js(page, numero_limpio)
+        if resultado is not None:
+            return resultado
 
-            return False
+        try:
+            url = f"https://web.whatsapp.com/send?phone={numero_limpio}"
+            await page.goto(url, wait_until="domcontentloaded", timeout=30_000)
+
+            # Esperar hasta 30 segundos a que aparezca el input o el error;
+            # si lo que apareció es el input del chat → número tiene WhatsApp
+            elemento = await page.wait_for_selector(self.SEL_WAIT, timeout=30_000)
+            return bool(await elemento.evaluate("(el, sel) => el.matches(sel)", self.SEL_VALID))
 
         except Exception as exc:
             log.debug(f"   Error verificando {telefono}: {exc}")
             # Capturar pantalla y mostrar URL para diagnóstico
             try:
                 screenshot_path = self.profile_dir / f"error_{numero_limpio}.png"
-                self._page.screenshot(path=str(screenshot_path))
+                await page.screenshot(path=str(screenshot_path))
                 log.debug(f"   📸  Captura guardada: {screenshot_path}")
             except Exception:
                 pass
-            log.debug(f"   URL actual: {self._page.url}")
-            log.debug(f"   Título: {self._page.title()}")
-            return False
+            log.debug(f"   URL actual: {page.url}")
+            try:
+                log.debug(f"   Título: {await page.title()}")
+            except Exception:
+                pass
+            # Un timeout no dice nada del número: el orquestador lo cuenta
+            # como error y no lo guarda en la caché
+            raise
 
-        finally:
-            time.sleep(random.uniform(self.pausa_min, self.pausa_max))
+
+# ════════════════════════════════════════════════════════════════════════════
+# 2b. VERIFICADOR POR LOTES — API de WhatsApp Business (endpoint contacts)
+# ════════════════════════════════════════════════════════════════════════════
+
+class VerificadorHTTPBatch:
+    """
+    Verifica números por lotes con el endpoint `contacts` de la API de
+    WhatsApp Business: una sola sesión TLS y una petición por cada lote
+    de hasta 50 números, sin navegador.
+    """
+
+    TAMANO_LOTE = 50   # máximo de números por petición
+
+    def __init__(self, api_url: str, token: str, tamano_lote: int = TAMANO_LOTE):
+        self.url         = api_url.rstrip("/") + "/v1/contacts"
+        self.token       = token
+        self.tamano_lote = max(1, min(tamano_lote, self.TAMANO_LOTE))
+        self._http       = None
+
+    async def iniciar(self):
+        if httpx is None:
+            log.error("❌  httpx no instalado (necesario para --mode http):")
+            log.error('   pip install "httpx[http2]"')
+            sys.exit(1)
+        if not self.token:
+            log.error("❌  Falta WA_API_TOKEN en .env (necesario para --mode http).")
+            sys.exit(1)
+        try:
+            self._http = self._crear_cliente(http2=True)
+        except ImportError:
+            # http2=True requiere el paquete h2
+            self._http = self._crear_cliente(http2=False)
+        log.info(f"   🌐  API de WhatsApp Business: {self.url} (lotes de {self.tamano_lote})")
+
+    def _crear_cliente(self, http2: bool):
+        return httpx.AsyncClient(
+            http2=http2,
+            limits=httpx.Limits(max_connections=4, max_keepalive_connections=4),
+            headers={"Authorization": f"Bearer {self.token}"},
+            timeout=60.0,
+        )
+
+    async def cerrar(self):
+        try:
+            if self._http:
+                await self._http.aclose()
+        except Exception:
+            pass
+
+    async def verificar_lote(self, nums: list[str]) -> dict[str, bool]:
+        """
+        Verifica {nums} y devuelve {telefono: True/False} con los teléfonos
+        tal como vinieron. Un error HTTP se propaga: el lote queda pendiente.
+        """
+        resultados = {}
+        for i in range(0, len(nums), self.tamano_lote):
+            # La API espera +<dígitos>; se guarda el original para la respuesta
+            contactos = {"+" + _TEL_NO_DIGITO.sub("", t): t for t in nums[i:i + self.tamano_lote]}
+            resp = await self._http.post(
+                self.url,
+                json={"blocking": "wait", "contacts": list(contactos)},
+            )
+            resp.raise_for_status()
+            for c in resp.json().get("contacts", []):
+                tel = contactos.get(c.get("input"))
+                if tel is not None:
+                    resultados[tel] = c.get("status") == "valid"
+        return resultados
 
 
 # ════════════════════════════════════════════════════════════════════════════
 # 3. MODO MOCK
 # ════════════════════════════════════════════════════════════════════════════
 
-def verificar_mock(telefono: str) -> bool:
+async def verificar_mock(telefono: str) -> bool:
     """Simulación ~35% tasa de éxito sin abrir WhatsApp."""
-    time.sleep(random.uniform(0.1, 0.3))
-    ultimo = re.sub(r"\D", "", telefono)[-1:]
+    await asyncio.sleep(random.uniform(0.1, 0.3))
+    ultimo = next((c for c in reversed(telefono) if c.isdecimal()), "")
     return ultimo in "02468"
 
 
@@ -373,38 +886,99 @@ def verificar_mock(telefono: str) -> bool:
 # 4. RATE LIMITER
 # ════════════════════════════════════════════════════════════════════════════
 
-class RateLimiter:
-    def __init__(self, max_por_hora: int):
-        self.max_por_hora   = max_por_hora
-        self.ventana_inicio = datetime.now()
-        self.count_ventana  = 0
-
-    def esperar_si_necesario(self):
-        ahora   = datetime.now()
-        elapsed = (ahora - self.ventana_inicio).total_seconds()
-        if elapsed >= 3600:
-            self.ventana_inicio = ahora
-            self.count_ventana  = 0
-            return
-        if self.count_ventana >= self.max_por_hora:
-            restante = 3600 - elapsed
-            log.warning(f"   ⏸️   Límite {self.max_por_hora}/hora alcanzado.")
-            log.warning(f"   ⏰  Esperando {restante/60:.1f} minutos...")
-            time.sleep(restante + 5)
-            self.ventana_inicio = datetime.now()
-            self.count_ventana  = 0
-
-    def registrar(self):
-        self.count_ventana += 1
-
-    def progreso(self) -> str:
-        return f"{self.count_ventana}/{self.max_por_hora}"
+# RateLimiter y CubetaTokens viven en hot.py (compilable con mypyc)
 
 
 # ════════════════════════════════════════════════════════════════════════════
 # 5. ORQUESTADOR PRINCIPAL
 # ════════════════════════════════════════════════════════════════════════════
 
+async def verificar_por_lotes(verif: VerificadorHTTPBatch, pendientes: Iterator[dict],
+                              cubeta: CubetaTokens, anotar) -> int:
+    """
+    Recorre {pendientes} en lotes de verif.tamano_lote números; cada lote
+    espera sus tokens y se resuelve en una sola petición. Un lote que falla
+    queda sin marcar (se reintenta con --reanudar), igual que los números
+    que la API no incluyó en la respuesta. Devuelve los errores.
+    """
+    errores = 0
+    await verif.iniciar()
+    try:
+        while lote := list(itertools.islice(pendientes, verif.tamano_lote)):
+            tels = list(dict.fromkeys(l["telefono"] for l in lote))
+            await cubeta.adquirir(len(tels))
+            try:
+                resultados = await verif.verificar_lote(tels)
+            except Exception as exc:
+                log.warning(f"   ⚠️  Error en lote de {len(tels)} números: {exc}")
+                errores += len(lote)
+                continue
+            faltantes = 0
+            for lead in lote:
+                resultado = resultados.get(lead["telefono"])
+                if resultado is None:
+                    faltantes += 1
+                    continue
+                anotar(lead, resultado)
+            if faltantes:
+                log.warning(f"   ⚠️  {faltantes} números sin respuesta de la API (se reintentan con --reanudar)")
+                errores += faltantes
+    finally:
+        await verif.cerrar()
+    return errores
+
+
+async def verificar_web(verif: VerificadorWhatsApp, pendientes: Iterator[dict],
+                        rate: RateLimiter, anotar) -> int:
+    """
+    Reparte {pendientes} entre las pestañas de {verif}: verif.paginas
+    tareas toman leads del mismo iterador (como mucho una verificación en
+    vuelo por pestaña), todas bajo el mismo RateLimiter. Devuelve los errores.
+    """
+    await verif.iniciar()
+    try:
+        errores = await asyncio.gather(
+            *(_recorrer(verif.verificar, pendientes, rate, anotar,
+                        pausa=(verif.pausa_min, verif.pausa_max))
+              for _ in range(verif.paginas)))
+    finally:
+        await verif.cerrar()
+    return sum(errores)
+
+
+async def _recorrer(verificar, pendientes: Iterator[dict], rate: RateLimiter, anotar,
+                    pausa: tuple[float, float] = (0, 0)) -> int:
+    """
+    Verifica leads de {pendientes} uno a uno con {verificar} bajo {rate},
+    con una {pausa} aleatoria (anti-baneo) después de anotar cada uno.
+    Varios _recorrer pueden compartir el mismo iterador. Devuelve los errores.
+    """
+    errores = 0
+    for lead in pendientes:
+        telefono = lead["telefono"]
+        await rate.esperar()
+        rate.registrar()
+        try:
+            anotar(lead, await verificar(telefono))
+        except Exception as exc:
+            log.warning(f"   ⚠️  Error en {telefono}: {exc}")
+            errores += 1
+            anotar(lead, False, cachear=False)
+        # La pausa corre mientras el hilo de I/O escribe el progreso
+        if pausa[1]:
+            await asyncio.sleep(random.uniform(*pausa))
+    return errores
+
+
+def _configurar_event_loop():
+    # ── Fix para Windows (Python 3.11+) ───────────────────────────────────────
+    # Playwright necesita ProactorEventLoop en Windows (es el default).
+    if sys.platform == "win32":
+        asyncio.set_event_loop_policy(asyncio.WindowsProactorEventLoopPolicy())
+    elif uvloop is not None:
+        asyncio.set_event_loop_policy(uvloop.EventLoopPolicy())
+
+
 def main():
     args = parse_args()
 
@@ -417,120 +991,201 @@ def main():
     log.info(f"   Máx/hora   : {args.max_hora}")
     log.info(f"   Pausa      : {args.pausa}–{args.pausa_max} seg")
     log.info(f"   Perfil     : {args.profile}")
+    log.info(f"   Modo       : {args.mode}")
+    log.info(f"   Pestañas   : {args.paginas}")
     log.info(f"   Mock       : {'SÍ' if args.mock else 'NO'}")
     log.info(f"   Reanudar   : {'SÍ' if args.reanudar else 'NO'}")
-
-    # ── Cargar leads ──────────────────────────────────────────────────────────
-    leads = cargar_leads(args.input)
-    log.info(f"   📥  {len(leads)} leads cargados.")
-
-    leads_con_tel = [l for l in leads if l.get("telefono")]
-    leads_sin_tel = [l for l in leads if not l.get("telefono")]
-    log.info(f"   Con teléfono : {len(leads_con_tel)}")
-    log.info(f"   Sin teléfono : {len(leads_sin_tel)} → marcados inválidos")
-
-    for lead in leads_sin_tel:
-        lead["whatsapp_valido"]    = False
-        lead["whatsapp_estado"]    = "sin_telefono"
-        lead["fecha_verificacion"] = datetime.now().strftime("%Y-%m-%d")
+    log.info(f"   Caché      : {'NO' if args.sin_cache or args.mock else f'{args.cache_dias} días'}")
 
     # ── Checkpoint ────────────────────────────────────────────────────────────
-    procesados = set()
+    ruta_diario   = str(Path(args.output).with_suffix(".jsonl"))
+    ruta_progreso = str(Path(args.output).with_suffix(".metadata.json"))
+    checkpoint  = Checkpoint(DEFAULT_CHECKPOINT)
+    # En --mock los resultados son inventados: no se leen ni guardan en la caché
+    usar_cache  = not (args.sin_cache or args.mock)
+    cache       = PhoneCache(checkpoint, args.cache_dias) if usar_cache else None
+    procesados  = set()
+    verificados = {}   # teléfono → campos de verificación
     if args.reanudar:
-        procesados = cargar_checkpoint(DEFAULT_CHECKPOINT)
-
-    pendientes = [l for l in leads_con_tel if l.get("telefono") not in procesados]
-    ya_listos  = [l for l in leads_con_tel if l.get("telefono") in procesados]
-    log.info(f"   Pendientes   : {len(pendientes)}")
-    log.info(f"   Ya listos    : {len(ya_listos)} (checkpoint)")
+        if Path(CHECKPOINT_JSON).exists():
+            checkpoint.add_many(cargar_checkpoint_json(CHECKPOINT_JSON))
+            Path(CHECKPOINT_JSON).unlink()
+            log.info(f"   🔁  {CHECKPOINT_JSON} migrado a {DEFAULT_CHECKPOINT}.")
+        procesados = checkpoint.cargar()
+        # El diario trae el resultado de cada número y puede ir hasta
+        # 9 leads por delante del checkpoint
+        verificados = cargar_diario(ruta_diario)
+        if verificados:
+            log.info(f"   📂  Diario cargado: {len(verificados)} teléfonos con resultado.")
+        procesados |= verificados.keys()
+    else:
+        checkpoint.vaciar()
+        Path(ruta_diario).unlink(missing_ok=True)
 
-    if not pendientes:
+    # ── Cargar leads ──────────────────────────────────────────────────────────
+    ruta_con_tel, ruta_sin_tel, conteos = preparar_entrada(
+        args.input, verificados, procesados, directorio=str(Path(args.output).parent))
+    atexit.register(_borrar_temporales, ruta_con_tel, ruta_sin_tel)
+    log.info(f"   📥  {conteos['total']} leads cargados.")
+    log.info(f"   Con teléfono : {conteos['con_tel']}")
+    log.info(f"   Sin teléfono : {conteos['sin_tel']} → marcados inválidos")
+    log.info(f"   Pendientes   : {conteos['pendientes']}")
+    log.info(f"   Ya listos    : {conteos['ya_listos']} (checkpoint)")
+
+    def todos_los_leads() -> Iterator[dict]:
+        """Une las dos particiones con los resultados de esta ejecución."""
+        yield from _iter_jsonl(ruta_sin_tel)
+        for lead in _iter_jsonl(ruta_con_tel):
+            lead.update(verificados.get(lead["telefono"], ()))
+            yield lead
+
+    def guardar_todo() -> tuple:
+        # Dos pasadas por las particiones en disco: una cuenta para la
+        # metadata y la otra escribe; nunca se junta la lista completa
+        conteo = contar_resultados(todos_los_leads())
+        guardar_resultados(todos_los_leads(), args.output, conteo)
+        return conteo
+
+    if not conteos["pendientes"]:
+        checkpoint.cerrar()
         log.info("   ✅  Todos verificados. Guardando output final...")
-        guardar_resultados(leads_sin_tel + leads_con_tel, args.output)
-        imprimir_resumen(leads_sin_tel + leads_con_tel, args.output)
+        imprimir_resumen(guardar_todo(), args.output)
         return
 
+    def iter_pendientes() -> Iterator[dict]:
+        # Un teléfono repetido se verifica una sola vez; el resultado se
+        # aplica a todos sus leads al unir las particiones
+        vistos = set(procesados)
+        for lead in _iter_jsonl(ruta_con_tel):
+            telefono = lead["telefono"] = _tel(lead["telefono"])
+            if telefono in vistos:
+                continue
+            vistos.add(telefono)
+            # Un acierto en la caché no consume rate limit ni abre WhatsApp
+            en_cache = cache.get(telefono) if cache else None
+            if en_cache is not None:
+                anotar(lead, en_cache, cachear=False, desde_cache=True)
+                continue
+            yield lead
+
+    pendientes = iter_pendientes()
+
     # ── Inicializar verificador ───────────────────────────────────────────────
     rate  = RateLimiter(max_por_hora=args.max_hora)
     verif = None
 
-    if not args.mock:
+    if args.mock:
+        log.info("   🎭  Modo MOCK — no se abre WhatsApp.")
+    elif args.mode == "http":
+        if not WA_API_URL:
+            log.error("❌  Falta WA_API_URL en .env (necesario para --mode http).")
+            sys.exit(1)
+        verif = VerificadorHTTPBatch(WA_API_URL, WA_API_TOKEN,
+                                     tamano_lote=min(VerificadorHTTPBatch.TAMANO_LOTE, args.max_hora))
+        rate  = CubetaTokens(args.max_hora, capacidad=verif.tamano_lote)
+    else:
+        if args.cargar_estado and not Path(args.cargar_estado).exists():
+            log.error(f"❌  No existe {args.cargar_estado}. Genéralo una vez con:")
+            log.error(f"   py -3.11 verificar_whatsapp.py --debug --guardar-estado {args.cargar_estado}")
+            sys.exit(1)
         verif = VerificadorWhatsApp(
             profile_dir=args.profile,
             headless  = not args.debug,
             pausa_min = args.pausa,
             pausa_max = args.pausa_max,
+            paginas   = args.paginas,
+            # Con --debug el navegador se ve (QR): se carga la página completa
+            bloquear_recursos = not (args.recursos_completos or args.debug),
+            cargar_estado  = args.cargar_estado,
+            guardar_estado = args.guardar_estado,
         )
-        verif.iniciar()
-    else:
-        log.info("   🎭  Modo MOCK — no se abre WhatsApp.")
 
     # ── Bucle de verificación ─────────────────────────────────────────────────
-    total   = len(pendientes)
-    validos = 0
-    errores = 0
-    inicio  = datetime.now()
-
-    try:
-        for i, lead in enumerate(pendientes, 1):
-            telefono = lead["telefono"]
-            rate.esperar_si_necesario()
-
-            try:
-                resultado = verificar_mock(telefono) if args.mock else verif.verificar(telefono)
-            except KeyboardInterrupt:
-                log.warning("\n   ⚠️  Interrupción manual. Guardando progreso...")
-                break
-            except Exception as exc:
-                log.warning(f"   ⚠️  Error en {telefono}: {exc}")
-                resultado = False
-                errores  += 1
-
-            lead["whatsapp_valido"]    = resultado
-            lead["whatsapp_estado"]    = "valido" if resultado else "invalido"
-            lead["fecha_verificacion"] = datetime.now().strftime("%Y-%m-%d")
-
-            if resultado:
-                validos += 1
+    total    = conteos["pendientes"]
+    validos  = 0
+    errores  = 0
+    en_cache = 0
+    i        = 0
+    inicio   = time.monotonic()
+
+    diario  = Path(ruta_diario).open("ab")
+    # Un hilo para el sidecar de progreso: se escribe mientras corre la pausa
+    io_pool = ThreadPoolExecutor(max_workers=1)
+
+    def anotar(lead: dict, resultado: bool, cachear: bool = True,
+               desde_cache: bool = False):
+        nonlocal i, validos, en_cache
+        telefono = lead["telefono"]
+        i += 1
+
+        campos = marcar_lead(lead, resultado)
+
+        if resultado:
+            validos += 1
+
+        anexar_diario(diario, lead)
+        procesados.add(telefono)
+        checkpoint.add(telefono)
+        if cache and cachear:
+            cache.set(telefono, resultado)
+        if desde_cache:
+            en_cache += 1
+        checkpoint.commit_if_batch()
+        verificados[telefono] = campos
+
+        pct    = i * 100 // total
+        eta    = _calcular_eta(inicio, i, total)
+        estado = "✅" if resultado else "❌"
+        origen = "  (caché)" if desde_cache else ""
+        log.info(
+            f"   [{i:>3}/{total}] {pct:>3}%  {estado}  "
+            f"{telefono:<18}  válidos={validos}{origen}  "
+            f"rate={rate.progreso()}  ETA={eta}"
+        )
 
-            rate.registrar()
-            procesados.add(telefono)
+        # Progreso cada 10 leads
+        if i % 10 == 0:
+            escritura = io_pool.submit(guardar_progreso, ruta_progreso, procesados=i,
+                                       pendientes=total - i, validos=validos,
+                                       total_leads=conteos["total"])
+            escritura.add_done_callback(_avisar_progreso)
 
-            pct    = i * 100 // total
-            eta    = _calcular_eta(inicio, i, total)
-            estado = "✅" if resultado else "❌"
-            log.info(
-                f"   [{i:>3}/{total}] {pct:>3}%  {estado}  "
-                f"{telefono:<18}  válidos={validos}  "
-                f"rate={rate.progreso()}  ETA={eta}"
-            )
+    _configurar_event_loop()
+    try:
+        if isinstance(verif, VerificadorHTTPBatch):
+            errores = asyncio.run(verificar_por_lotes(verif, pendientes, rate, anotar))
+        elif isinstance(verif, VerificadorWhatsApp):
+            errores = asyncio.run(verificar_web(verif, pendientes, rate, anotar))
+        else:
+            errores = asyncio.run(_recorrer(verificar_mock, pendientes, rate, anotar))
 
-            # Checkpoint cada 10 leads
-            if i % 10 == 0:
-                guardar_checkpoint(DEFAULT_CHECKPOINT, procesados)
-                guardar_resultados(leads_sin_tel + leads_con_tel, args.output)
-                log.debug("   💾  Checkpoint guardado.")
+    except KeyboardInterrupt:
+        log.warning("\n   ⚠️  Interrupción manual. Guardando progreso...")
 
     finally:
-        if verif:
-            verif.cerrar()
-        # Guardar checkpoint final y resultados
-        guardar_checkpoint(DEFAULT_CHECKPOINT, procesados)
-        guardar_resultados(leads_sin_tel + leads_con_tel, args.output)
+        # Guardar checkpoint final y resultados (única escritura del output)
+        io_pool.shutdown(wait=True)
+        diario.close()
+        checkpoint.commit()
+        conteo = guardar_todo()
 
     # ── Resultado final ───────────────────────────────────────────────────────
-    todos = leads_sin_tel + leads_con_tel
-    guardar_resultados(todos, args.output)
-
-    if len(procesados) >= len(leads_con_tel):
-        Path(DEFAULT_CHECKPOINT).unlink(missing_ok=True)
-        log.info("   🧹  Checkpoint eliminado (verificación completa).")
+    if en_cache:
+        log.info(f"   💾  {en_cache} números resueltos desde la caché.")
+    if i >= total:
+        # La base se conserva siempre: guarda también la caché de números
+        # (aunque esta ejecución haya sido --sin-cache o --mock)
+        checkpoint.vaciar()
+        checkpoint.cerrar()
+        Path(ruta_diario).unlink(missing_ok=True)
+        Path(ruta_progreso).unlink(missing_ok=True)
+        log.info("   🧹  Checkpoint vaciado y diario eliminado (verificación completa).")
     else:
-        guardar_checkpoint(DEFAULT_CHECKPOINT, procesados)
+        checkpoint.cerrar()
 
-    # Al final de main(), justo después de guardar_resultados(todos, args.output)
+    # Al final de main(), después de guardar_resultados en el finally
     try:
-        imprimir_resumen(todos, args.output)
+        imprimir_resumen(conteo, args.output)
     except Exception as e:
         log.warning(f"⚠️ No se pudo imprimir el resumen (entorno no UTF-8): {e}")
         # No relanzamos la excepción, para que el script termine con código 0
@@ -539,26 +1194,21 @@ def main():
 # 6. UTILIDADES
 # ════════════════════════════════════════════════════════════════════════════
 
-def _calcular_eta(inicio: datetime, completados: int, total: int) -> str:
-    if completados == 0:
-        return "--:--"
-    elapsed   = (datetime.now() - inicio).total_seconds()
-    por_lead  = elapsed / completados
-    segundos  = int(por_lead * (total - completados))
-    if segundos < 60:
-        return f"{segundos}s"
-    elif segundos < 3600:
-        return f"{segundos // 60}m {segundos % 60}s"
+def _avisar_progreso(escritura):
+    """Callback del hilo de I/O: informa si falló la escritura del progreso."""
+    if escritura.exception():
+        log.warning(f"   ⚠️  No se pudo guardar el progreso: {escritura.exception()}")
     else:
-        return f"{segundos // 3600}h {(segundos % 3600) // 60}m"
+        log.debug("   💾  Progreso guardado.")
+
+
+def _borrar_temporales(*rutas: str):
+    for ruta in rutas:
+        Path(ruta).unlink(missing_ok=True)
 
 
-def imprimir_resumen(leads: list, output_path: str):
-    total       = len(leads)
-    verificados = sum(1 for l in leads if l.get("whatsapp_valido") is not None)
-    validos     = sum(1 for l in leads if l.get("whatsapp_valido") is True)
-    invalidos   = sum(1 for l in leads if l.get("whatsapp_valido") is False)
-    sin_tel     = sum(1 for l in leads if l.get("whatsapp_estado") == "sin_telefono")
+def imprimir_resumen(conteo: tuple, output_path: str):
+    total, verificados, validos, invalidos, sin_tel = conteo
     tasa        = validos * 100 // max(verificados - sin_tel, 1)
 
     print("\n" + "═" * 60)